@@ -0,0 +1,69 @@
+
+########################################################################################
+#
+#  S P R I N G   L A Y O U T S :  M U L T I L E V E L   V S   N E T W O R K X
+#
+#  Times springlayout_2D/3D with engine='multilevel' and engine='networkx' on a
+#  connected graph and on a disconnected graph (three components plus isolated nodes).
+#  For the disconnected graph it checks that every component keeps a usable share of
+#  the normalized layout instead of drifting apart and shrinking to a point.
+#
+#  usage : python benchmark_forcelayout.py [n_nodes ...]
+#
+########################################################################################
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cartoGRAPHs'))
+
+import numpy as np
+import networkx as nx
+
+from cartoGRAPHs import springlayout_2D, springlayout_3D
+
+SIZES = [1000, 5000]
+ITERATIONS = 50
+ENGINES = ['multilevel', 'networkx']
+MIN_COMPONENT_SPAN = 0.2
+
+
+def disconnected_graph(n):
+    '''
+    Three Barabasi-Albert components of n/3 nodes each plus two isolated nodes.
+    '''
+    G = nx.disjoint_union_all([nx.barabasi_albert_graph(n // 3, 2, seed=i) for i in range(3)])
+    G.add_nodes_from(['isolated_1', 'isolated_2'])
+    return G
+
+
+def component_spans(G, posG):
+    '''
+    Largest extent (over the axes) of each connected component with more than one node.
+    '''
+    return [np.ptp(np.array([posG[n] for n in c]), axis=0).max()
+            for c in nx.connected_components(G) if len(c) > 1]
+
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or SIZES
+
+    # compile the numba kernels once
+    springlayout_2D(nx.path_graph(100), ITERATIONS)
+    springlayout_3D(nx.path_graph(100), ITERATIONS)
+
+    print('%8s %14s %4s %12s %10s %20s' % ('nodes', 'graph', 'dim', 'engine', 'time [s]', 'min component span'))
+    for n in sizes:
+        graphs = [('connected', nx.powerlaw_cluster_graph(n, 3, 0.1, seed=1)),
+                  ('disconnected', disconnected_graph(n))]
+        for name, G in graphs:
+            for dim, layout in [(2, springlayout_2D), (3, springlayout_3D)]:
+                for engine in ENGINES:
+                    t0 = time.perf_counter()
+                    posG = layout(G, ITERATIONS, engine=engine, seed=1)
+                    t = time.perf_counter() - t0
+                    span = min(component_spans(G, posG))
+                    print('%8d %14s %4d %12s %10.2f %20.2f' % (n, name, dim, engine, t, span))
+                    if engine == 'multilevel':
+                        assert span >= MIN_COMPONENT_SPAN, 'components collapsed in the %s layout' % engine
@@ -0,0 +1,57 @@
+
+########################################################################################
+#
+#  I M P O R T   T I M E   O F   T H E   C A R T O G R A P H S   P A C K A G E
+#
+#  Each statement is timed in a fresh interpreter, so no module is cached between runs.
+#  "from cartoGRAPHs import *" loads every submodule and corresponds to the former
+#  (eager) package import.
+#
+#  usage : python benchmark_import.py [repeats]
+#
+########################################################################################
+
+import os
+import sys
+import subprocess
+
+PACKAGE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cartoGRAPHs')
+
+STATEMENTS = ['import cartoGRAPHs',
+              'from cartoGRAPHs import rnd_walk_matrix2',
+              'from cartoGRAPHs import exportVR_CSV, exportVR_JSON',
+              'from cartoGRAPHs import generate_layout',
+              'from cartoGRAPHs import *',
+              'import cartoGRAPHs, umap, seaborn, sklearn.cluster']
+
+TIMER = '''
+import time
+t0 = time.perf_counter()
+exec({stmt!r})
+print(time.perf_counter() - t0)
+'''
+
+
+def time_statement(stmt, repeats=3):
+    '''
+    Run "stmt" in "repeats" fresh python processes.
+    Return list of wall times in seconds.
+    '''
+    times = []
+    for i in range(repeats):
+        out = subprocess.run([sys.executable, '-c', TIMER.format(stmt=stmt)],
+                             cwd=PACKAGE_ROOT, capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return times
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    # warm up the OS file cache
+    time_statement(STATEMENTS[-1], repeats=1)
+
+    print('%-55s %10s %10s' % ('statement', 'best [s]', 'mean [s]'))
+    for stmt in STATEMENTS:
+        times = time_statement(stmt, repeats)
+        print('%-55s %10.3f %10.3f' % (stmt, min(times), sum(times) / len(times)))
@@ -0,0 +1,68 @@
+
+########################################################################################
+#
+#  R A N D O M   W A L K   W I T H   R E S T A R T :  D E N S E   V S   S P A R S E
+#
+#  Times the network propagation matrix of the global layouts computed with the dense
+#  inverse (rnd_walk_matrix2), the sparse solvers (rnd_walk_matrix2(sparse=True) with
+#  solver 'splu' and 'power'), the blocked engine (rnd_walk_matrix_blocked, for each
+#  number of threads up to the number of cores) and the top-k feature matrix
+#  (rnd_walk_matrix_topk). Reports the maximal difference to the dense result.
+#
+#  usage : python benchmark_rwr.py [n_nodes ...]
+#
+########################################################################################
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cartoGRAPHs'))
+
+import numpy as np
+import networkx as nx
+
+from cartoGRAPHs.func_calculations import rnd_walk_matrix2, rnd_walk_matrix_blocked, rnd_walk_matrix_topk
+
+SIZES = [1000, 5000]
+R = 0.9
+ALPHA = 1.0
+TOPK = 50
+
+
+def timed(func, *args, **kwargs):
+    '''
+    Return wall time in seconds and the result of func.
+    '''
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - t0, result
+
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or SIZES
+    cores = os.cpu_count() or 1
+    threads = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+
+    print('cores: %d' % cores)
+    print('%8s %32s %10s %14s' % ('nodes', 'method', 'time [s]', 'max |W - W_dense|'))
+    for n in sizes:
+        G = nx.powerlaw_cluster_graph(n, 3, 0.1, seed=1)
+        A = nx.adjacency_matrix(G)
+
+        t, W = timed(rnd_walk_matrix2, A.toarray(), R, ALPHA, n)
+        print('%8d %32s %10.2f %14s' % (n, 'dense inverse', t, '-'))
+
+        for solver in ['splu', 'power']:
+            t, W_s = timed(rnd_walk_matrix2, A, R, ALPHA, n, sparse=True, solver=solver)
+            print('%8d %32s %10.2f %14.1e' % (n, 'sparse, solver=%s' % solver, t, np.abs(W_s - W).max()))
+            del W_s
+
+        for n_jobs in threads:
+            t, W_b = timed(rnd_walk_matrix_blocked, A, R, ALPHA, n, n_jobs=n_jobs)
+            print('%8d %32s %10.2f %14.1e' % (n, 'blocked, n_jobs=%d' % n_jobs, t, np.abs(W_b - W).max()))
+            del W_b
+
+        for solver in ['splu', 'power']:
+            t, T = timed(rnd_walk_matrix_topk, A, R, ALPHA, n, k=TOPK, solver=solver)
+            print('%8d %32s %10.2f %14s' % (n, 'top-%d, solver=%s' % (TOPK, solver), t, '-'))
@@ -0,0 +1,59 @@
+
+########################################################################################
+#
+#  U M A P   E X E C U T I O N   M O D E S :  R E P R O D U C I B L E   V S   F A S T
+#
+#  Times generate_layout in mode='reproducible' (fixed seed, single threaded) and
+#  mode='fast' (no seed, numba parallel on all cores) and checks whether two runs
+#  give the same layout. The number of cores used by numba can be set with the
+#  environment variable NUMBA_NUM_THREADS.
+#
+#  usage : python benchmark_umap_mode.py [n_nodes ...]
+#
+########################################################################################
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cartoGRAPHs'))
+
+import numpy as np
+import networkx as nx
+import numba
+
+from cartoGRAPHs import generate_layout
+
+SIZES = [1000, 5000]
+LAYOUTS = [('local', 2), ('global', 2), ('global', 3)]
+MODES = ['reproducible', 'fast']
+
+
+def time_layout(G, dim, layoutmethod, mode):
+    '''
+    Generate a layout.
+    Return wall time in seconds and the layout coordinates.
+    '''
+    t0 = time.perf_counter()
+    posG = generate_layout(G, dim, layoutmethod, 'umap', mode=mode)
+    return time.perf_counter() - t0, posG.coords
+
+
+if __name__ == '__main__':
+    sizes = [int(n) for n in sys.argv[1:]] or SIZES
+
+    # compile the numba functions of umap/pynndescent once for all modes
+    G_warmup = nx.connected_watts_strogatz_graph(200, 6, 0.1, seed=0)
+    for mode in MODES:
+        time_layout(G_warmup, 2, 'local', mode)
+
+    print('numba threads: %d' % numba.config.NUMBA_NUM_THREADS)
+    print('%8s %12s %4s %14s %10s %10s %14s' % ('nodes', 'layout', 'dim', 'mode', 'run 1 [s]', 'run 2 [s]', 'identical'))
+    for n in sizes:
+        G = nx.powerlaw_cluster_graph(n, 3, 0.1, seed=1)
+        for layoutmethod, dim in LAYOUTS:
+            for mode in MODES:
+                t1, coords1 = time_layout(G, dim, layoutmethod, mode)
+                t2, coords2 = time_layout(G, dim, layoutmethod, mode)
+                print('%8d %12s %4d %14s %10.2f %10.2f %14s' % (n, layoutmethod, dim, mode, t1, t2,
+                                                                 np.array_equal(coords1, coords2)))
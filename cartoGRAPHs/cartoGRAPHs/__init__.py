@@ -1,10 +1,93 @@
 
-from .cartoGRAPHs import *
-from .func_calculations import *
-from .func_load_data import *
-from .func_embed_plot import *
-from .func_visual_properties import *
-from .func_exportVR import *
+########################################################################################
+#
+# Submodules are imported on first access of one of their names (PEP 562), so that
+# "import cartoGRAPHs" stays cheap for tools which only need a few functions.
+# "from cartoGRAPHs import *" still loads everything, as before.
+#
+########################################################################################
+
+import ast
+import os
+import importlib
+
+# same order as the former star imports : later modules shadow earlier ones
+_submodules = ['cartoGRAPHs',
+               'func_calculations',
+               'func_load_data',
+               'func_embed_plot',
+               'func_visual_properties',
+               'func_exportVR',
+               'func_cache',
+               'func_layout',
+               'func_forcelayout']
+
+# names the package used to re-export from third party libraries
+_reexports = {'TSNE': 'sklearn.manifold',
+              'KMeans': 'sklearn.cluster',
+              'DBSCAN': 'sklearn.cluster',
+              'SpectralClustering': 'sklearn.cluster',
+              'pairwise_distances': 'sklearn.metrics',
+              'normalize': 'sklearn.preprocessing'}
+
+_name_to_module = None
+
+
+def _module_names(modname):
+    '''
+    Get top level names bound in a submodule by parsing its source (without importing it).
+    '''
+    path = os.path.join(os.path.dirname(__file__), modname + '.py')
+    with open(path) as f:
+        tree = ast.parse(f.read())
+
+    names = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.append(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names.extend(t.id for t in targets if isinstance(t, ast.Name))
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name != '*':
+                    names.append(alias.asname or alias.name.split('.')[0])
+    return [n for n in names if not n.startswith('_')]
 
-#print('DEBUG: in init: import done')
 
+def _name_table():
+    global _name_to_module
+    if _name_to_module is None:
+        table = {}
+        for modname in _submodules:
+            for name in _module_names(modname):
+                table[name] = modname
+        _name_to_module = table
+    return _name_to_module
+
+
+def __getattr__(name):
+    if name == '__all__':
+        for modname in _submodules:
+            importlib.import_module('.' + modname, __name__)
+        return sorted(set(_submodules) | set(_name_table()) | set(_reexports))
+
+    table = _name_table()
+    if name in _submodules:
+        return importlib.import_module('.' + name, __name__)
+    elif name in table:
+        module = importlib.import_module('.' + table[name], __name__)
+        value = getattr(module, name)
+    elif name in _reexports:
+        value = getattr(importlib.import_module(_reexports[name]), name)
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules) | set(_name_table()) | set(_reexports))
+
+#print('DEBUG: in init: import done')
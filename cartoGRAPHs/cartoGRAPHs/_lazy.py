@@ -0,0 +1,46 @@
+########################################################################################
+#
+# This python file is part of the Project "cartoGRAPHs"
+# and contains H E L P E R S  F O R  L A Z Y  I M P O R T S
+#
+########################################################################################
+
+import sys
+import types
+import importlib
+
+########################################################################################
+
+
+class _LazyModule(types.ModuleType):
+    '''
+    Placeholder for a module that is imported on first attribute access.
+    '''
+
+    def __getattr__(self, attr):
+        module = self.__dict__.get('_module')
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+    def __repr__(self):
+        state = 'loaded' if '_module' in self.__dict__ else 'not loaded'
+        return "<lazy module '%s' (%s)>" % (self.__name__, state)
+
+
+def lazy_import(name):
+    '''
+    Return module "name" without importing it yet; the actual import happens on first
+    attribute access (e.g. umap.UMAP). Modules which are already imported are returned as is.
+    Input:
+    - name = dotted module name, e.g. 'sklearn.manifold'
+
+    Return module or lazy placeholder.
+    '''
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
@@ -13,12 +13,18 @@ from cartoGRAPHs.func_visual_properties import *
 from cartoGRAPHs.func_calculations import * 
 from cartoGRAPHs.func_embed_plot import *
 from cartoGRAPHs.func_exportVR import * 
+from cartoGRAPHs.func_cache import * 
+from cartoGRAPHs.func_layout import * 
+from cartoGRAPHs.func_forcelayout import * 
+
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 
 ########################################################################################
 
 
-def generate_layout(G, dim, layoutmethod, dimred_method='umap', Matrix = None):
+def generate_layout(G, dim, layoutmethod, dimred_method='umap', Matrix = None, cache_dir = None, cache_maxsize = 1024, mode = 'reproducible'):
     '''
     Generates a layout of choice.
     
@@ -27,35 +33,182 @@ def generate_layout(G, dim, layoutmethod, dimred_method='umap', Matrix = None):
     dim - int; 2 or 3 dimensions
     layouttype - string; for layout type > 'local','global','importance','functional'
     dimred_method - string; optional > choose between e.g. tsne or umap 
+    cache_dir - string; optional > directory of a persistent layout cache, layouts are only computed if not cached yet
+    cache_maxsize - float; optional > maximal size of the layout cache in MB (least recently used layouts are removed)
+    mode - string; optional > 'reproducible' (fixed seed, identical layouts) or 'fast' (parallel on all cores, no seed), see execution_params
     
     Result: 
     A generated layout of choice to be input to a plot function e.g. plot_2Dfigure, plot_3Dfigure
     '''
+    tsne_params, umap_params = _layout_params(layoutmethod, mode)
+    
+    if cache_dir is None:
+        return _generate_layout(G, dim, layoutmethod, dimred_method, Matrix, tsne_params, umap_params)
+    
+    key = _layout_key(G, dim, layoutmethod, dimred_method, Matrix, tsne_params, umap_params)
+    posG = load_cached_layout(cache_dir, key)
+    if posG is None:
+        posG = _generate_layout(G, dim, layoutmethod, dimred_method, Matrix, tsne_params, umap_params)
+        if posG is not None:
+            store_cached_layout(cache_dir, key, G, posG, max_size=cache_maxsize)
+            
+    return posG
+        
+        
+def _layout_params(layoutmethod, mode='reproducible'):
+    
+    tsne_params = dict(prplxty=50, density=12, l_rate=200, steps=250, metric='cosine', mode=mode)
+    umap_params = dict(n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine', mode=mode)
+    if layoutmethod == 'precalculated':
+        tsne_params['density'] = 1
+        
+    return tsne_params, umap_params
+
+
+def _layout_key(G, dim, layoutmethod, dimred_method, Matrix, tsne_params, umap_params):
+    
+    if dimred_method == 'tsne':
+        params, seed = tsne_params, TSNE_SEED
+    else: 
+        params, seed = umap_params, UMAP_SEED
+    
+    # the execution mode enters the key through the seed (None in fast mode)
+    if params['mode'] == 'fast':
+        seed = None
+    params = {k: v for k, v in params.items() if k != 'mode'}
+        
+    return layout_cache_key(G, dim, layoutmethod, dimred_method, params=params, seed=seed, 
+                            Matrix=Matrix if layoutmethod in ('functional','precalculated') else None)
+
+
+def generate_layouts(G, specs, Matrix = None, n_jobs = None, cache_dir = None, cache_maxsize = 1024, mode = 'reproducible'):
+    '''
+    Generates several layouts of one graph in a single pass. 
+    The input matrix of each layout method (adjacency, network propagation, centralities) is computed 
+    only once and shared by all layouts using it; the embeddings run concurrently.
+    
+    Input: 
+    G - A networkx Graph
+    specs - list of tuples (layoutmethod, dim) or (layoutmethod, dim, dimred_method); see generate_layout
+    Matrix - optional > functional or precalculated matrix, used by all specs of these layout methods
+    n_jobs - int; optional > number of worker threads (default: number of CPUs)
+    cache_dir - string; optional > directory of a persistent layout cache (see generate_layout)
+    cache_maxsize - float; optional > maximal size of the layout cache in MB
+    mode - string; optional > 'reproducible' or 'fast', see generate_layout
+    
+    Result: 
+    Dictionary with (layoutmethod, dim, dimred_method) as keys and generated layouts as values.
+    '''
+    specs = [tuple(spec) if len(spec) == 3 else (spec[0], spec[1], 'umap') for spec in specs]
+    
+    d_posG = {}
+    todo = []
+    for spec in dict.fromkeys(specs):
+        layoutmethod, dim, dimred_method = spec
+        
+        if layoutmethod not in _layout_matrices and layoutmethod not in ('functional','precalculated'):
+            print('Something went wrong. Please enter a valid layout type.')
+            d_posG[spec] = None
+        elif layoutmethod in ('functional','precalculated') and Matrix is None:
+            print('Please specify a %s matrix of choice with N x rows of G.nodes and M x columns of features.' % layoutmethod)
+            d_posG[spec] = None
+        elif cache_dir is not None:
+            tsne_params, umap_params = _layout_params(layoutmethod, mode)
+            key = _layout_key(G, dim, layoutmethod, dimred_method, Matrix, tsne_params, umap_params)
+            d_posG[spec] = load_cached_layout(cache_dir, key)
+            if d_posG[spec] is None:
+                todo.append(spec)
+        else:
+            todo.append(spec)
+    
+    if todo:
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = os.cpu_count() or 1
+        n_jobs = min(n_jobs, len(todo))
+        
+        with ThreadPoolExecutor(max_workers = n_jobs) as pool:
+            
+            # shared input matrices, each computed once 
+            matrix_futures = {}
+            for layoutmethod in dict.fromkeys(spec[0] for spec in todo):
+                if layoutmethod in _layout_matrices:
+                    matrix_futures[layoutmethod] = pool.submit(_layout_matrices[layoutmethod], G)
+            
+            layout_futures = {}
+            for spec in todo:
+                layoutmethod, dim, dimred_method = spec
+                DM = matrix_futures[layoutmethod].result() if layoutmethod in matrix_futures else Matrix
+                layout_futures[spec] = pool.submit(_embed_layout, G, DM, dim, layoutmethod, dimred_method, mode)
+            
+            for spec, future in layout_futures.items():
+                d_posG[spec] = future.result()
+                
+        if cache_dir is not None:
+            for spec in todo:
+                layoutmethod, dim, dimred_method = spec
+                if d_posG[spec] is not None:
+                    tsne_params, umap_params = _layout_params(layoutmethod, mode)
+                    key = _layout_key(G, dim, layoutmethod, dimred_method, Matrix, tsne_params, umap_params)
+                    store_cached_layout(cache_dir, key, G, d_posG[spec], max_size=cache_maxsize)
+    
+    return {spec: d_posG[spec] for spec in specs}
+
+
+def _embed_layout(G, DM, dim, layoutmethod, dimred_method, mode='reproducible'):
+    '''
+    Embedding step of _generate_layout for an already computed input matrix DM.
+    '''
+    tsne_params, umap_params = _layout_params(layoutmethod, mode)
+    
+    if layoutmethod == 'functional':
+        if dimred_method == 'tsne':
+            return layout_functional_tsne(G, DM, dim, **tsne_params)
+        elif dimred_method == 'umap':
+            return layout_functional_umap(G, DM, dim, **umap_params)
+    
+    elif layoutmethod == 'precalculated':
+        if dimred_method == 'tsne':
+            return layout_portrait_tsne(G, DM, dim, **tsne_params) 
+        elif dimred_method == 'umap':
+            return layout_portrait_umap(G, DM, dim, **umap_params)
+    
+    else:
+        # local, global and importance layouts use the default scaling of get_posG_2D/3D_norm
+        if dimred_method == 'tsne':
+            return layout_portrait_tsne(G, DM, dim, **tsne_params) 
+        elif dimred_method == 'umap':
+            return layout_portrait_umap(G, DM, dim, r_scale=1.05, **umap_params)
+    
+    print('Something went wrong. Please enter a valid dimensionality reduction method.')
+
+    
+def _generate_layout(G, dim, layoutmethod, dimred_method, Matrix, tsne_params, umap_params):
+    
     if layoutmethod == 'local':
         if dimred_method == 'tsne':
-            return layout_local_tsne(G, dim, prplxty=50, density=12, l_rate=200, steps=250, metric='cosine')
+            return layout_local_tsne(G, dim, **tsne_params)
         elif dimred_method == 'umap':
-            return layout_local_umap(G, dim, n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine')
+            return layout_local_umap(G, dim, **umap_params)
             
     elif layoutmethod == 'global':
         if dimred_method == 'tsne':
-            return layout_global_tsne(G, dim, prplxty=50, density=12, l_rate=200, steps=250, metric='cosine')
+            return layout_global_tsne(G, dim, **tsne_params)
         elif dimred_method == 'umap':
-            return layout_global_umap(G, dim, n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine')
+            return layout_global_umap(G, dim, **umap_params)
         
     elif layoutmethod == 'importance':
         if dimred_method == 'tsne':
-            return layout_importance_tsne(G, dim, prplxty=50, density=12, l_rate=200, steps=250, metric='cosine')
+            return layout_importance_tsne(G, dim, **tsne_params)
         elif dimred_method == 'umap':
-            return layout_importance_umap(G, dim, n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine')
+            return layout_importance_umap(G, dim, **umap_params)
         
     elif layoutmethod == 'functional':
         if Matrix is None: 
             print('Please specify a functional matrix of choice with N x rows with G.nodes and M x feature columns.')
         elif dimred_method == 'tsne' and Matrix is not None:
-            return layout_functional_tsne(G, Matrix, dim,prplxty=50, density=12, l_rate=200, steps=250, metric='cosine')
+            return layout_functional_tsne(G, Matrix, dim, **tsne_params)
         elif dimred_method == 'umap' and Matrix is not None:
-            return layout_functional_umap(G, Matrix,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine')  
+            return layout_functional_umap(G, Matrix, dim, **umap_params)  
         else: 
             print('Something went wrong. Please enter a valid layout type.')
     
@@ -63,39 +216,136 @@ def generate_layout(G, dim, layoutmethod, dimred_method='umap', Matrix = None):
         if Matrix is None: 
             print('Please specify a precalculated matrix of choice with N x rows of G.nodes and M x columns of features.')
         elif dimred_method == 'tsne':
-            return layout_portrait_tsne(G,Matrix,dim,prplxty=50, density=1, l_rate=200, steps=250, metric='cosine') 
+            return layout_portrait_tsne(G, Matrix, dim, **tsne_params) 
         elif dimred_method == 'umap':
-            return layout_portrait_umap(G,Matrix,dim,n_neighbors=8, spread=1, min_dist=0.0, metric='cosine')
+            return layout_portrait_umap(G, Matrix, dim, **umap_params)
     else: 
         print('Something went wrong. Please enter a valid layout type.')
         
         
 
+# UMAP epochs and learning rate when starting from a previous layout
+WARM_START_EPOCHS = 100
+WARM_START_LEARNING_RATE = 0.25
+
+
+def _warm_start(G, DM, dim, init_posG, n_epochs):
+    
+    if init_posG is None:
+        return 'spectral', n_epochs, 1
+    
+    if n_epochs is None:
+        n_epochs = WARM_START_EPOCHS
+        
+    return warm_start_init(G, DM, init_posG, dim), n_epochs, WARM_START_LEARNING_RATE
+
+
 #--------------------
 #
-# L O C A L 
+# L A Y O U T  M A T R I C E S 
 #
 #--------------------
 
-def layout_local_tsne(G,dim,prplxty=50, density=12, l_rate=200, steps=250, metric='cosine'):
+def matrix_local(G, sparse=False):
+    '''
+    Adjacency matrix of G (input of the local layouts).
+    Input: 
+    - G = networkx Graph
+    - sparse = bool; return a scipy sparse matrix (rows in the order of G.nodes()) instead of a dense DataFrame
+    
+    Return pd.DataFrame with G.nodes as index and columns, or scipy sparse matrix.
+    '''
     
     A = nx.adjacency_matrix(G, nodelist=list(G.nodes()))
-    A_array = A.toarray()
-    DM = pd.DataFrame(A_array, columns = list(G.nodes()), index=list(G.nodes()))
+    
+    if sparse:
+        DM = sp.csr_matrix(A, dtype=float)
+    else:
+        A_array = A.toarray()
+        DM = pd.DataFrame(A_array, columns = list(G.nodes()), index=list(G.nodes()))
+        DM.index = list(G.nodes())
+        DM.columns = list(G.nodes()) 
+    
+    return DM
+
+
+def matrix_global(G, topk=None, eps=None):
+    '''
+    Network propagation (Random Walk with Restart) matrix of G (input of the global layouts).
+    Input: 
+    - G = networkx Graph
+    - topk = int; keep only the top-k visiting probabilities per node (sparse feature matrix)
+    - eps = float; keep only visiting probabilities above eps (sparse feature matrix)
+    
+    Return pd.DataFrame with G.nodes as index and columns, or scipy sparse matrix if topk or eps are set.
+    '''
+    
+    r=0.9
+    alpha=1.0
+    A = nx.adjacency_matrix(G)
+    
+    if topk is None and eps is None:
+        FM_m_array = rnd_walk_matrix2(A, r, alpha, len(G.nodes()))
+        DM = pd.DataFrame(FM_m_array).T
+        DM.index = list(G.nodes())
+        DM.columns = list(G.nodes()) 
+    else:
+        DM = rnd_walk_matrix_topk(A, r, alpha, len(G.nodes()), k=topk, eps=eps)
+    
+    return DM
+
+
+def matrix_importance(G, centrality_cache=None):
+    '''
+    Centrality feature matrix of G (input of the importance layouts).
+    Input: 
+    - G = networkx Graph
+    - centrality_cache = string; optional .npz file caching the centralities (see compute_centralities)
+    
+    Return pd.DataFrame with G.nodes as index and columns degs, clos, betw, eigen.
+    '''
+    
+    feature_dict_sorted = compute_centralityfeatures(G, cache_path=centrality_cache) 
+    
+    DM = pd.DataFrame.from_dict(feature_dict_sorted,orient = 'index',columns = ['degs','clos','betw','eigen'])
     DM.index = list(G.nodes())
-    DM.columns = list(G.nodes()) 
+    
+    return DM
+
+
+# input matrix of each layout method, see generate_layouts
+_layout_matrices = {'local': matrix_local,
+                    'global': matrix_global,
+                    'importance': matrix_importance}
+
+
+#--------------------
+#
+# L O C A L 
+#
+#--------------------
+
+def layout_local_tsne(G,dim,prplxty=50, density=12, l_rate=200, steps=250, metric='cosine', sparse=False, mode='reproducible'):
+    '''
+    Local layout based on the adjacency matrix.
+    Optional: 
+    - sparse = bool; embed the sparse adjacency matrix directly (rows in the order of G.nodes()) instead of a dense DataFrame
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
+    
+    DM = matrix_local(G, sparse)
     
     if dim == 2:
         r_scale = 1.2
-        tsne2D = embed_tsne_2D(DM, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_2D_norm(G, DM, tsne2D) #, r_scale)
+        tsne2D = embed_tsne_2D(DM, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_2D_norm(G, DM, tsne2D, metric=metric) #, r_scale)
         
         return posG
     
     elif dim == 3: 
         r_scale = 1.2
-        tsne3D = embed_tsne_3D(DM, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_3D_norm(G, DM, tsne3D) #, r_scale)
+        tsne3D = embed_tsne_3D(DM, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_3D_norm(G, DM, tsne3D, metric=metric) #, r_scale)
         
         return posG
         
@@ -103,25 +353,35 @@ def layout_local_tsne(G,dim,prplxty=50, density=12, l_rate=200, steps=250, metri
         print('Please choose dimensions, by either setting dim=2 or dim=3.')
 
 
-def layout_local_umap(G,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine'):
+def layout_local_umap(G,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine', sparse=False, init_posG=None, n_epochs=None, keep_model=False, mode='reproducible'):
+    '''
+    Local layout based on the adjacency matrix.
+    Optional: 
+    - sparse = bool; embed the sparse adjacency matrix directly (rows in the order of G.nodes()) instead of a dense DataFrame
+    - init_posG = previous layout (e.g. of an earlier version of the graph) to start from, see warm_start_init
+    - n_epochs = int; number of UMAP epochs (default: UMAP default, WARM_START_EPOCHS with init_posG)
+      (with init_posG the learning rate is lowered to WARM_START_LEARNING_RATE to keep positions stable)
+    - keep_model = bool; keep the fitted UMAP model and the embedded matrix with the layout (posG.model) to add nodes later, see place_nodes
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
     
-    A = nx.adjacency_matrix(G, nodelist=list(G.nodes()))
-    A_array = A.toarray()
-    DM = pd.DataFrame(A_array, columns = list(G.nodes()), index=list(G.nodes()))
-    DM.index = list(G.nodes())
-    DM.columns = list(G.nodes()) 
+    DM = matrix_local(G, sparse)
+    
+    init, n_epochs, learn_rate = _warm_start(G, DM, dim, init_posG, n_epochs)
     
     if dim == 2:
         r_scale = 1.2
-        umap2D = embed_umap_2D(DM, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_2D_norm(G, DM, umap2D) #r_scale
+        umap2D, mapper = embed_umap_2D(DM, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_2D_norm(G, DM, umap2D, metric=metric) #r_scale
+        if keep_model: posG.model.keep(mapper, DM)
         
         return posG
     
     elif dim == 3:
         r_scale = 1.2
-        umap_3D = embed_umap_3D(DM, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_3D_norm(G, DM, umap_3D) #r_scale
+        umap_3D, mapper = embed_umap_3D(DM, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_3D_norm(G, DM, umap_3D, metric=metric) #r_scale
+        if keep_model: posG.model.keep(mapper, DM)
 
         return posG
         
@@ -135,27 +395,28 @@ def layout_local_umap(G,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cos
 #
 #--------------------
 
-def layout_global_tsne(G,dim,prplxty=50, density=12, l_rate=200, steps=250, metric='cosine'):
+def layout_global_tsne(G,dim,prplxty=50, density=12, l_rate=200, steps=250, metric='cosine', topk=None, eps=None, mode='reproducible'):
+    '''
+    Global layout based on network propagation (Random Walk with Restart).
+    Optional: 
+    - topk = int; keep only the top-k visiting probabilities per node (sparse feature matrix)
+    - eps = float; keep only visiting probabilities above eps (sparse feature matrix)
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
     
-    r=0.9
-    alpha=1.0
-    A = nx.adjacency_matrix(G)
-    FM_m_array = rnd_walk_matrix2(A, r, alpha, len(G.nodes()))
-    DM = pd.DataFrame(FM_m_array).T
-    DM.index = list(G.nodes())
-    DM.columns = list(G.nodes()) 
+    DM = matrix_global(G, topk, eps)
     
     if dim == 2:
         r_scale = 1.2
-        tsne2D = embed_tsne_2D(DM, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_2D_norm(G, DM, tsne2D) #, r_scale)
+        tsne2D = embed_tsne_2D(DM, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_2D_norm(G, DM, tsne2D, metric=metric) #, r_scale)
         
         return posG
     
     elif dim == 3: 
         r_scale = 1.2
-        tsne3D = embed_tsne_3D(DM, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_3D_norm(G, DM, tsne3D) #, r_scale)
+        tsne3D = embed_tsne_3D(DM, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_3D_norm(G, DM, tsne3D, metric=metric) #, r_scale)
 
         return posG
         
@@ -163,26 +424,35 @@ def layout_global_tsne(G,dim,prplxty=50, density=12, l_rate=200, steps=250, metr
         print('Please choose dimensions, by either setting dim=2 or dim=3.')
 
         
-def layout_global_umap(G,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine'):
+def layout_global_umap(G,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine', topk=None, eps=None, init_posG=None, n_epochs=None, keep_model=False, mode='reproducible'):
+    '''
+    Global layout based on network propagation (Random Walk with Restart).
+    Optional: 
+    - topk = int; keep only the top-k visiting probabilities per node (sparse feature matrix)
+    - eps = float; keep only visiting probabilities above eps (sparse feature matrix)
+    - init_posG = previous layout (e.g. of an earlier version of the graph) to start from, see warm_start_init
+    - n_epochs = int; number of UMAP epochs (default: UMAP default, WARM_START_EPOCHS with init_posG)
+      (with init_posG the learning rate is lowered to WARM_START_LEARNING_RATE to keep positions stable)
+    - keep_model = bool; keep the fitted UMAP model and the embedded matrix with the layout (posG.model) to add nodes later, see place_nodes
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
     
-    r=0.9
-    alpha=1.0
-    A = nx.adjacency_matrix(G)
-    FM_m_array = rnd_walk_matrix2(A, r, alpha, len(G.nodes()))
-    DM = pd.DataFrame(FM_m_array).T
-    DM.index = list(G.nodes())
-    DM.columns = list(G.nodes()) 
+    DM = matrix_global(G, topk, eps)
+    
+    init, n_epochs, learn_rate = _warm_start(G, DM, dim, init_posG, n_epochs)
     
     if dim == 2:
         r_scale = 1.2
-        umap2D = embed_umap_2D(DM, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_2D_norm(G, DM, umap2D) #r_scale
+        umap2D, mapper = embed_umap_2D(DM, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_2D_norm(G, DM, umap2D, metric=metric) #r_scale
+        if keep_model: posG.model.keep(mapper, DM)
         
         return posG
     
     elif dim == 3: 
-        umap_3D = embed_umap_3D(DM, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_3D_norm(G, DM, umap_3D) #r_scale
+        umap_3D, mapper = embed_umap_3D(DM, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_3D_norm(G, DM, umap_3D, metric=metric) #r_scale
+        if keep_model: posG.model.keep(mapper, DM)
 
         return posG
         
@@ -197,24 +467,27 @@ def layout_global_umap(G,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='co
 #
 #--------------------
 
-def layout_importance_tsne(G,dim,prplxty=50, density=12, l_rate=200, steps=250, metric='cosine'):
-    
-    feature_dict_sorted = compute_centralityfeatures(G) 
+def layout_importance_tsne(G,dim,prplxty=50, density=12, l_rate=200, steps=250, metric='cosine', centrality_cache=None, mode='reproducible'):
+    '''
+    Importance layout based on degree, closeness, betweenness and eigenvector centrality.
+    Optional: 
+    - centrality_cache = string; .npz file caching the centralities, recomputed only if the graph changes
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
     
-    DM = pd.DataFrame.from_dict(feature_dict_sorted,orient = 'index',columns = ['degs','clos','betw','eigen'])
-    DM.index = list(G.nodes())
+    DM = matrix_importance(G, centrality_cache)
     
     if dim == 2:
         r_scale = 1.2
-        tsne2D = embed_tsne_2D(DM, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_2D_norm(G, DM, tsne2D) #, r_scale)
+        tsne2D = embed_tsne_2D(DM, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_2D_norm(G, DM, tsne2D, metric=metric) #, r_scale)
         
         return posG
     
     elif dim == 3: 
         r_scale = 1.2
-        tsne3D = embed_tsne_3D(DM, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_3D_norm(G, DM, tsne3D) #, r_scale)
+        tsne3D = embed_tsne_3D(DM, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_3D_norm(G, DM, tsne3D, metric=metric) #, r_scale)
 
         return posG
         
@@ -222,23 +495,34 @@ def layout_importance_tsne(G,dim,prplxty=50, density=12, l_rate=200, steps=250,
         print('Please choose dimensions, by either setting dim=2 or dim=3.')
 
 
-def layout_importance_umap(G,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine'):
+def layout_importance_umap(G,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine', centrality_cache=None, init_posG=None, n_epochs=None, keep_model=False, mode='reproducible'):
+    '''
+    Importance layout based on degree, closeness, betweenness and eigenvector centrality.
+    Optional: 
+    - centrality_cache = string; .npz file caching the centralities, recomputed only if the graph changes
+    - init_posG = previous layout (e.g. of an earlier version of the graph) to start from, see warm_start_init
+    - n_epochs = int; number of UMAP epochs (default: UMAP default, WARM_START_EPOCHS with init_posG)
+      (with init_posG the learning rate is lowered to WARM_START_LEARNING_RATE to keep positions stable)
+    - keep_model = bool; keep the fitted UMAP model and the embedded matrix with the layout (posG.model) to add nodes later, see place_nodes
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
     
-    feature_dict_sorted = compute_centralityfeatures(G) 
-
-    DM = pd.DataFrame.from_dict(feature_dict_sorted,orient = 'index',columns = ['degs','clos','betw','eigen'])
-    DM.index = list(G.nodes())
+    DM = matrix_importance(G, centrality_cache)
 
+    init, n_epochs, learn_rate = _warm_start(G, DM, dim, init_posG, n_epochs)
+    
     if dim == 2:
         r_scale = 1.2
-        umap2D = embed_umap_2D(DM, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_2D_norm(G, DM, umap2D) #r_scale
+        umap2D, mapper = embed_umap_2D(DM, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_2D_norm(G, DM, umap2D, metric=metric) #r_scale
+        if keep_model: posG.model.keep(mapper, DM)
         
         return posG
     
     elif dim == 3: 
-        umap_3D = embed_umap_3D(DM, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_3D_norm(G, DM, umap_3D) #r_scale
+        umap_3D, mapper = embed_umap_3D(DM, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_3D_norm(G, DM, umap_3D, metric=metric) #r_scale
+        if keep_model: posG.model.keep(mapper, DM)
 
         return posG
         
@@ -254,17 +538,22 @@ def layout_importance_umap(G,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric
 #
 #--------------------
 
-def layout_functional_tsne(G, Matrix,dim,prplxty=50, density=12, l_rate=200, steps=250, metric='cosine',r_scale = 1.2):
+def layout_functional_tsne(G, Matrix,dim,prplxty=50, density=12, l_rate=200, steps=250, metric='cosine',r_scale = 1.2, mode='reproducible'):
+    '''
+    Functional layout based on a feature matrix with nodes as rows.
+    Optional: 
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
     
     if dim == 2:
-        tsne2D = embed_tsne_2D(Matrix, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_2D_norm(G, Matrix, tsne2D, r_scale)
+        tsne2D = embed_tsne_2D(Matrix, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_2D_norm(G, Matrix, tsne2D, r_scale, metric=metric)
         
         return posG
     
     elif dim == 3: 
-        tsne3D = embed_tsne_3D(Matrix, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_3D_norm(G, Matrix, tsne3D, r_scale)
+        tsne3D = embed_tsne_3D(Matrix, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_3D_norm(G, Matrix, tsne3D, r_scale, metric=metric)
 
         return posG
         
@@ -272,17 +561,30 @@ def layout_functional_tsne(G, Matrix,dim,prplxty=50, density=12, l_rate=200, ste
         print('Please choose dimensions, by either setting dim=2 or dim=3.')
 
 
-def layout_functional_umap(G, Matrix,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine',r_scale = 1.2):
+def layout_functional_umap(G, Matrix,dim,n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine',r_scale = 1.2, init_posG=None, n_epochs=None, keep_model=False, mode='reproducible'):
+    '''
+    Functional layout based on a feature matrix with nodes as rows.
+    Optional: 
+    - init_posG = previous layout (e.g. of an earlier version of the graph) to start from, see warm_start_init
+    - n_epochs = int; number of UMAP epochs (default: UMAP default, WARM_START_EPOCHS with init_posG)
+      (with init_posG the learning rate is lowered to WARM_START_LEARNING_RATE to keep positions stable)
+    - keep_model = bool; keep the fitted UMAP model and the embedded matrix with the layout (posG.model) to add nodes later, see place_nodes
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
+    
+    init, n_epochs, learn_rate = _warm_start(G, Matrix, dim, init_posG, n_epochs)
     
     if dim == 2:
-        umap2D = embed_umap_2D(Matrix, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_2D_norm(G, Matrix, umap2D,r_scale)
+        umap2D, mapper = embed_umap_2D(Matrix, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_2D_norm(G, Matrix, umap2D, r_scale, metric=metric)
+        if keep_model: posG.model.keep(mapper, Matrix)
         
         return posG
     
     elif dim == 3: 
-        umap_3D = embed_umap_3D(Matrix, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_3D_norm(G, Matrix, umap_3D,r_scale)
+        umap_3D, mapper = embed_umap_3D(Matrix, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_3D_norm(G, Matrix, umap_3D, r_scale, metric=metric)
+        if keep_model: posG.model.keep(mapper, Matrix)
 
         return posG
         
@@ -301,11 +603,8 @@ def layout_topographic(posG2D, d_z):
     
     z_list_norm = preprocessing.minmax_scale((list(d_z.values())), feature_range=(0, 1.0), axis=0, copy=True)
 
-    posG_topographic = {}
-    cc = 0
-    for k,v in posG2D.items():
-        posG_topographic[k] = (v[0],v[1],z_list_norm[cc])
-        cc+=1
+    posG2D = as_layout(posG2D)
+    posG_topographic = Layout(posG2D.nodes, np.column_stack((posG2D.coords[:,:2], z_list_norm)))
     
     return posG_topographic
 
@@ -316,24 +615,35 @@ def layout_topographic(posG2D, d_z):
 #
 #--------------------
 
-def layout_geodesic(G, d_radius, n_neighbors=8, spread=1.0, min_dist=0.0, DM=None):
+def layout_geodesic(G, d_radius, n_neighbors=8, spread=1.0, min_dist=0.0, DM=None, topk=None, eps=None, keep_model=False, mode='reproducible'):
+    '''
+    Geodesic (spherical) layout with radius of each node from d_radius.
+    Optional: 
+    - keep_model = bool; keep the fitted UMAP model and the embedded matrix with the layout (posG.model) to add nodes later, see place_nodes
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
     
     #radius_list_norm = preprocessing.minmax_scale((list(d_radius.values())), feature_range=(0, 1.0), axis=0, copy=True)
     #d_radius_norm = dict(zip(list(G.nodes()), radius_list_norm))
     
-    if DM is None or DM.empty is True:
+    if DM is None or (not sp.issparse(DM) and DM.empty is True):
         r=0.9
         alpha=1.0
         A = nx.adjacency_matrix(G)
-        FM_m_array = rnd_walk_matrix2(A, r, alpha, len(G.nodes()))
-        DM = pd.DataFrame(FM_m_array).T
-    
-    elif DM.all != None:
+        if topk is None and eps is None:
+            FM_m_array = rnd_walk_matrix2(A, r, alpha, len(G.nodes()))
+            DM = pd.DataFrame(FM_m_array).T
+            DM.index = list(G.nodes())
+        else:
+            DM = rnd_walk_matrix_topk(A, r, alpha, len(G.nodes()), k=topk, eps=eps)
+    
+    elif sp.issparse(DM) or DM.all != None:
         pass 
 
-    umap_geodesic = embed_umap_sphere(DM, n_neighbors, spread, min_dist)
+    umap_geodesic = embed_umap_sphere(DM, n_neighbors, spread, min_dist, mode=mode)
     posG_geodesic = get_posG_sphere_norm(G, DM, umap_geodesic, d_radius, #d_radius_norm,
                                          radius_rest_genes = 20)
+    if keep_model: posG_geodesic.model.keep(umap_geodesic, DM)
 
     return posG_geodesic
 
@@ -341,22 +651,34 @@ def layout_geodesic(G, d_radius, n_neighbors=8, spread=1.0, min_dist=0.0, DM=Non
 #--------------------------------------------------------------------------
 #--------------------------------------------------------------------------
 #
-# N E T W O R K X Spring Layouts
+# Spring Layouts (multilevel force-directed or N E T W O R K X)
 #
 #--------------------------------------------------------------------------
 #--------------------------------------------------------------------------
 
-def springlayout_2D(G, itr):
+def springlayout_2D(G, itr, engine='multilevel', seed=None):
+    '''
+    Force-directed layout.
+    Input: 
+    - G = Graph
+    - itr = int; number of iterations (per level for the multilevel engine)
+    - engine = string; 'multilevel' (Barnes-Hut multilevel layout, see force_layout) or 'networkx' (nx.spring_layout, O(n^2) per iteration)
+    - seed = int; random seed
+    
+    Return Layout (dict-like) with nodes as keys and coordinates as values, normalized to (0,1).
+    '''
     
-    posG_spring2D = nx.spring_layout(G, iterations = itr, dim = 2)
+    if engine == 'multilevel':
+        return Layout(list(G.nodes()), forcelayout_coords(G, 2, itr, seed=seed))
+    
+    posG_spring2D = nx.spring_layout(G, iterations = itr, dim = 2, seed = seed)
 
     df_posG = pd.DataFrame(posG_spring2D).T
     x = df_posG.values 
     min_max_scaler = preprocessing.MinMaxScaler()
     x_scaled = min_max_scaler.fit_transform(x)
-    df_posG_norm = pd.DataFrame(x_scaled)
     
-    posG_spring2D_norm = dict(zip(list(G.nodes()),zip(df_posG_norm[0].values,df_posG_norm[1].values)))
+    posG_spring2D_norm = Layout(list(G.nodes()), x_scaled)
     
     del posG_spring2D
     del df_posG
@@ -364,17 +686,29 @@ def springlayout_2D(G, itr):
     return posG_spring2D_norm
 
 
-def springlayout_3D(G, itr):
+def springlayout_3D(G, itr, engine='multilevel', seed=None):
+    '''
+    Force-directed layout.
+    Input: 
+    - G = Graph
+    - itr = int; number of iterations (per level for the multilevel engine)
+    - engine = string; 'multilevel' (Barnes-Hut multilevel layout, see force_layout) or 'networkx' (nx.spring_layout, O(n^2) per iteration)
+    - seed = int; random seed
+    
+    Return Layout (dict-like) with nodes as keys and coordinates as values, normalized to (0,1).
+    '''
     
-    posG_spring3D = nx.spring_layout(G, iterations = itr, dim = 3)
+    if engine == 'multilevel':
+        return Layout(list(G.nodes()), forcelayout_coords(G, 3, itr, seed=seed))
+    
+    posG_spring3D = nx.spring_layout(G, iterations = itr, dim = 3, seed = seed)
 
     df_posG = pd.DataFrame(posG_spring3D).T
     x = df_posG.values 
     min_max_scaler = preprocessing.MinMaxScaler()
     x_scaled = min_max_scaler.fit_transform(x)
-    df_posG_norm = pd.DataFrame(x_scaled)
     
-    posG_spring3D_norm = dict(zip(list(G.nodes()),zip(df_posG_norm[0].values,df_posG_norm[1].values,df_posG_norm[2].values)))
+    posG_spring3D_norm = Layout(list(G.nodes()), x_scaled)
     
     del posG_spring3D
     del df_posG
@@ -391,19 +725,24 @@ def springlayout_3D(G, itr):
 #--------------------------------------------------------------------------
 #--------------------------------------------------------------------------
 
-def layout_portrait_tsne(G, DM, dim, prplxty=50, density=12, l_rate=200, steps=250, metric='cosine'):
+def layout_portrait_tsne(G, DM, dim, prplxty=50, density=12, l_rate=200, steps=250, metric='cosine', mode='reproducible'):
+    '''
+    Layout of a precalculated matrix DM with nodes as rows.
+    Optional: 
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
     
     if dim == 2:
         r_scale = 1.2
-        tsne2D = embed_tsne_2D(DM, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_2D_norm(G, DM, tsne2D) #, r_scale)
+        tsne2D = embed_tsne_2D(DM, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_2D_norm(G, DM, tsne2D, metric=metric) #, r_scale)
         
         return posG
     
     elif dim == 3: 
         r_scale = 1.2
-        tsne3D = embed_tsne_3D(DM, prplxty, density, l_rate, steps, metric)
-        posG = get_posG_3D_norm(G, DM, tsne3D) #, r_scale)
+        tsne3D = embed_tsne_3D(DM, prplxty, density, l_rate, steps, metric, mode=mode)
+        posG = get_posG_3D_norm(G, DM, tsne3D, metric=metric) #, r_scale)
         
         return posG
         
@@ -412,17 +751,30 @@ def layout_portrait_tsne(G, DM, dim, prplxty=50, density=12, l_rate=200, steps=2
 
 
 
-def layout_portrait_umap(G, DM, dim, n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine',r_scale = 1.2):
+def layout_portrait_umap(G, DM, dim, n_neighbors=8, spread=1.0, min_dist=0.0, metric='cosine',r_scale = 1.2, init_posG=None, n_epochs=None, keep_model=False, mode='reproducible'):
+    '''
+    Layout of a precalculated matrix DM with nodes as rows.
+    Optional: 
+    - init_posG = previous layout (e.g. of an earlier version of the graph) to start from, see warm_start_init
+    - n_epochs = int; number of UMAP epochs (default: UMAP default, WARM_START_EPOCHS with init_posG)
+      (with init_posG the learning rate is lowered to WARM_START_LEARNING_RATE to keep positions stable)
+    - keep_model = bool; keep the fitted UMAP model and the embedded matrix with the layout (posG.model) to add nodes later, see place_nodes
+    - mode = string; 'reproducible' (fixed seed) or 'fast' (parallel, no seed), see execution_params
+    '''
+    
+    init, n_epochs, learn_rate = _warm_start(G, DM, dim, init_posG, n_epochs)
     
     if dim == 2:
-        umap2D = embed_umap_2D(DM, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_2D_norm(G, DM, umap2D,r_scale)
+        umap2D, mapper = embed_umap_2D(DM, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_2D_norm(G, DM, umap2D, r_scale, metric=metric)
+        if keep_model: posG.model.keep(mapper, DM)
         
         return posG
     
     elif dim == 3:
-        umap_3D = embed_umap_3D(DM, n_neighbors, spread, min_dist, metric)
-        posG = get_posG_3D_norm(G, DM, umap_3D,r_scale)
+        umap_3D, mapper = embed_umap_3D(DM, n_neighbors, spread, min_dist, metric, learn_rate=learn_rate, n_ep=n_epochs, init=init, return_model=True, mode=mode)
+        posG = get_posG_3D_norm(G, DM, umap_3D, r_scale, metric=metric)
+        if keep_model: posG.model.keep(mapper, DM)
 
         return posG
         
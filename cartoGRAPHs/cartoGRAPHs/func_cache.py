@@ -0,0 +1,297 @@
+########################################################################################
+#
+# This python file is part of the Project "cartoGRAPHs"
+# and contains F U N C T I O N S  F O R  C A C H I N G  L A Y O U T S
+# 
+########################################################################################
+
+import os
+import glob
+import json
+import pickle
+import hashlib
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+########################################################################################
+
+
+# -------------------------------------------------------------------------------------
+# F I N G E R P R I N T S 
+# -------------------------------------------------------------------------------------
+
+def graph_fingerprint(G, node_order=True, weight='weight'):
+    '''
+    Stable hash of a graph. 
+    Input: 
+    - G = networkx Graph
+    - node_order = bool; if True the order of G.nodes() is part of the hash, 
+      if False only the node set and edge set are hashed
+    - weight = string; edge attribute hashed with each edge (default 1 if missing, as in nx.adjacency_matrix), 
+      None hashes the edge set only
+    
+    Return string; hex digest.
+    '''
+    h = hashlib.sha256()
+    
+    nodes = [repr(n) for n in G.nodes()]
+    if not node_order:
+        nodes = sorted(nodes)
+    h.update('\n'.join(nodes).encode())
+    
+    if G.is_directed():
+        edges = [repr(u)+'\t'+repr(v) for u,v in G.edges()]
+    else:
+        edges = ['\t'.join(sorted((repr(u),repr(v)))) for u,v in G.edges()]
+    if weight is not None:
+        edges = [e+'\t'+repr(w) for e,(u,v,w) in zip(edges, G.edges(data=weight, default=1))]
+    h.update(b'\0')
+    h.update('\n'.join(sorted(edges)).encode())
+    
+    return h.hexdigest()
+
+
+def matrix_fingerprint(Matrix):
+    '''
+    Stable hash of a feature matrix. 
+    Input: 
+    - Matrix = pd.DataFrame, numpy array or scipy.sparse matrix 
+    
+    Return string; hex digest.
+    '''
+    h = hashlib.sha256()
+    
+    if isinstance(Matrix, pd.DataFrame):
+        h.update(repr(Matrix.index.tolist()).encode())
+        h.update(repr(Matrix.columns.tolist()).encode())
+        Matrix = Matrix.values
+        
+    if sp.issparse(Matrix):
+        Matrix = sp.csr_matrix(Matrix)
+        h.update(repr(Matrix.shape).encode())
+        for arr in (Matrix.data, Matrix.indices, Matrix.indptr):
+            h.update(np.ascontiguousarray(arr).tobytes())
+    else:
+        Matrix = np.ascontiguousarray(Matrix)
+        h.update(repr((Matrix.shape, Matrix.dtype.str)).encode())
+        h.update(Matrix.tobytes())
+        
+    return h.hexdigest()
+
+
+
+# -------------------------------------------------------------------------------------
+# L A Y O U T  C A C H E
+# -------------------------------------------------------------------------------------
+
+def layout_cache_key(G, dim, layoutmethod, dimred_method, params=None, seed=None, Matrix=None):
+    '''
+    Generate the cache key of a layout.
+    Input: 
+    - G = networkx Graph
+    - dim = int; 2 or 3 dimensions
+    - layoutmethod = string; e.g. 'local','global','importance','functional'
+    - dimred_method = string; e.g. 'tsne' or 'umap'
+    - params = dictionary with embedding parameters
+    - seed = random seed of the embedding 
+    - Matrix = optional feature matrix (e.g. for functional layouts)
+    
+    Return string; cache key (hex digest).
+    '''
+    d_key = {
+        'graph': graph_fingerprint(G, node_order=True),
+        'dim': dim,
+        'layoutmethod': layoutmethod,
+        'dimred_method': dimred_method,
+        'params': params,
+        'seed': seed,
+        'matrix': None if Matrix is None else matrix_fingerprint(Matrix),
+        }
+    
+    return hashlib.sha256(json.dumps(d_key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _cache_path(cache_dir, key, G=None):
+    '''
+    Return path of a cache entry. Files are named <graph>_<key>.pickle to be able to invalidate all entries of a graph.
+    '''
+    if G is not None:
+        return os.path.join(cache_dir, graph_fingerprint(G, node_order=False)[:16]+'_'+key+'.pickle')
+    
+    found = glob.glob(os.path.join(cache_dir, '*_'+key+'.pickle'))
+    return found[0] if found else None
+
+
+def load_cached_layout(cache_dir, key):
+    '''
+    Load a layout from the cache.
+    Input: 
+    - cache_dir = string; directory of the cache
+    - key = string; see layout_cache_key
+    
+    Return the stored posG or None if not cached.
+    '''
+    path = _cache_path(cache_dir, key)
+    if path is None:
+        return None
+    
+    try:
+        with open(path, 'rb') as f:
+            posG = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    
+    os.utime(path) # mark as recently used (LRU)
+    
+    return posG
+
+
+def store_cached_layout(cache_dir, key, G, posG, max_size=1024):
+    '''
+    Store a layout in the cache. Least recently used entries are removed if the cache exceeds max_size, 
+    a layout larger than max_size on its own is not stored.
+    Input: 
+    - cache_dir = string; directory of the cache
+    - key = string; see layout_cache_key
+    - G = networkx Graph the layout belongs to 
+    - posG = dictionary with nodes as keys and coordinates as values
+    - max_size = float; maximal size of the cache in MB 
+    
+    Return path of the cache entry, None if the layout is not stored.
+    '''
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, key, G)
+    
+    tmp = path+'.tmp'+str(os.getpid())
+    with open(tmp, 'wb') as f:
+        pickle.dump(posG, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    size = os.path.getsize(tmp)
+    if size > max_size*2**20:
+        os.remove(tmp)
+        print('Layout not cached: %.1f MB exceed the cache size of %s MB.' % (size/2**20, max_size))
+        return None
+    os.replace(tmp, path)
+    
+    evict_layoutcache(cache_dir, max_size, keep=path)
+    
+    return path
+
+
+def evict_layoutcache(cache_dir, max_size=1024, keep=None):
+    '''
+    Remove least recently used layouts until the cache is smaller than max_size.
+    Input: 
+    - cache_dir = string; directory of the cache
+    - max_size = float; maximal size of the cache in MB
+    - keep = string; optional path of an entry that is never removed (e.g. the one just stored)
+    
+    Return list of removed files.
+    '''
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, '*.pickle')):
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, path))
+    
+    total = sum(e[1] for e in entries)
+    removed = []
+    for mtime, size, path in sorted(entries):
+        if total <= max_size*2**20:
+            break
+        if path == keep:
+            continue
+        os.remove(path)
+        total -= size
+        removed.append(path)
+        
+    return removed
+
+
+def invalidate_layoutcache(cache_dir, key=None, G=None):
+    '''
+    Remove layouts from the cache.
+    Input: 
+    - cache_dir = string; directory of the cache
+    - key = string; optional, remove only this entry
+    - G = networkx Graph; optional, remove all entries of this graph (independent of node order)
+    If neither key nor G are given, the whole cache is cleared.
+    
+    Return list of removed files.
+    '''
+    if key is not None:
+        pattern = '*_'+key+'.pickle'
+    elif G is not None:
+        pattern = graph_fingerprint(G, node_order=False)[:16]+'_*.pickle'
+    else:
+        pattern = '*.pickle'
+        
+    removed = glob.glob(os.path.join(cache_dir, pattern))
+    for path in removed:
+        os.remove(path)
+        
+    return removed
+
+
+# -------------------------------------------------------------------------------------
+# C E N T R A L I T Y  C A C H E
+# -------------------------------------------------------------------------------------
+
+def store_cached_centralities(path, G, centralities, params=None):
+    '''
+    Store centrality features of a graph in a .npz file, together with the graph fingerprint 
+    (independent of node order) and the node order of the stored rows.
+    Input: 
+    - path = string; file path of the cache (.npz)
+    - G = networkx Graph
+    - centralities = numpy array (len(G.nodes) x 4) in the order of G.nodes
+    - params = dictionary with parameters of the computation (e.g. sampling)
+    
+    Return path of the cache file.
+    '''
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    
+    tmp = path+'.tmp'+str(os.getpid())
+    with open(tmp, 'wb') as f:
+        np.savez(f, 
+                 fingerprint=np.array(graph_fingerprint(G, node_order=False)),
+                 params=np.array(json.dumps(params, sort_keys=True, default=str)),
+                 nodes=np.array([repr(n) for n in G.nodes()]),
+                 centralities=np.asarray(centralities, dtype=float))
+    os.replace(tmp, path)
+    
+    return path
+
+
+def load_cached_centralities(path, G, params=None):
+    '''
+    Load centrality features of a graph from the cache and realign them to the node order of G.
+    Input: 
+    - path = string; file path of the cache (.npz)
+    - G = networkx Graph
+    - params = dictionary with parameters of the computation, must match the stored ones
+    
+    Return numpy array (len(G.nodes) x 4) in the order of G.nodes, or None if the cache 
+    is missing or belongs to a different graph or parameters.
+    '''
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            fingerprint = str(data['fingerprint'])
+            stored_params = str(data['params'])
+            nodes = data['nodes'].tolist()
+            centralities = data['centralities']
+    except (OSError, ValueError, KeyError):
+        return None
+    
+    if fingerprint != graph_fingerprint(G, node_order=False):
+        return None
+    if stored_params != json.dumps(params, sort_keys=True, default=str):
+        return None
+    
+    row = {node: i for i, node in enumerate(nodes)}
+    order = np.fromiter((row[repr(n)] for n in G.nodes()), dtype=np.intp, count=len(nodes))
+    
+    return centralities[order]
@@ -6,10 +6,22 @@
 # 
 ########################################################################################
 
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
 import numpy as np 
 import networkx as nx 
 import pandas as pd 
-from sklearn.preprocessing import normalize
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+import scipy.sparse.csgraph as csgraph
+
+from cartoGRAPHs._lazy import lazy_import
+from cartoGRAPHs.func_cache import load_cached_centralities, store_cached_centralities
+
+# heavy dependencies, imported on first use 
+preprocessing = lazy_import('sklearn.preprocessing')
 
 ########################################################################################
 
@@ -26,49 +38,236 @@ def feature_modulation(Struct_matrix, Funct_matrix, scalar_value):
     
     
     
-def compute_centralityfeatures(G):
+def compute_centralityfeatures(G, k=None, epsilon=None, delta=0.1, n_jobs=None, seed=None, cache_path=None):
     '''
     Compute degree,betweenness,closeness and eigenvector centrality
     Input: 
     - G: networkx Graph 
+    Optional (see compute_centralities): 
+    - k = int; number of sampled BFS sources for approximate closeness and betweenness
+    - epsilon = float; error bound of the approximation, sets k if k is None 
+    - delta = float; failure probability of the error bound 
+    - n_jobs = int; number of processes for the BFS sources
+    - seed = int; random seed of the source sampling
+    - cache_path = string; .npz file caching the centralities, recomputed only if the graph changes
     
     Return a dictionary sorted according to G.nodes with nodeID as keys and four centrality values. 
     ''' 
     
-    degs = dict(G.degree())
-    d_deghubs = {}
-    for node, de in sorted(degs.items(),key = lambda x: x[1], reverse = 1):
-        d_deghubs[node] = round(float(de/max(degs.values())),4)
+    centralities = np.round(compute_centralities(G, k=k, epsilon=epsilon, delta=delta, n_jobs=n_jobs, seed=seed, 
+                                                 cache_path=cache_path), 4)
+    
+    feature_dict_sorted = dict(zip(G.nodes(), map(tuple, centralities.tolist())))
+    
+    return feature_dict_sorted
 
-    closeness = nx.closeness_centrality(G)
-    d_clos = {}
-    for node, cl in sorted(closeness.items(), key = lambda x: x[1], reverse = 1):
-        d_clos[node] = round(cl,4)
 
-    betweens = nx.betweenness_centrality(G)
-    d_betw = {}
-    for node, be in sorted(betweens.items(), key = lambda x: x[1], reverse = 1):
-         d_betw[node] = round(be,4)
 
-    eigen = nx.eigenvector_centrality(G)
-    d_eigen = {}
-    for node, eig in sorted(eigen.items(), key = lambda x: x[1], reverse = 1):
-         d_eigen[node] = round(eig,4)
+#--------------------
+#
+# C E N T R A L I T Y  E N G I N E 
+#
+#--------------------
 
-    d_deghubs_sorted = {key:d_deghubs[key] for key in sorted(d_deghubs.keys())}
-    d_clos_sorted = {key:d_clos[key] for key in sorted(d_clos.keys())}
-    d_betw_sorted = {key:d_betw[key] for key in sorted(d_betw.keys())}
-    d_eigen_sorted = {key:d_eigen[key] for key in sorted(d_eigen.keys())}
+def compute_centralities(G, k=None, epsilon=None, delta=0.1, n_jobs=None, seed=None, block_size=None, cache_path=None):
+    '''
+    Degree, closeness, betweenness and eigenvector centrality of all nodes, computed on the sparse adjacency matrix.
+    Exact values are the same as networkx (degree/max. degree, closeness_centrality, normalized betweenness_centrality, 
+    eigenvector_centrality; all unweighted). BFS sources are processed in blocks, optionally in parallel processes. 
+    With k (or epsilon) closeness and betweenness are estimated from k uniformly sampled BFS sources; 
+    for k = ceil(ln(2n/delta) / (2 epsilon^2)) the betweenness error is below epsilon, and the error of the average 
+    distance (closeness) below epsilon * diameter, for all nodes with probability 1-delta.
+    Input: 
+    - G = networkx Graph
+    - k = int; number of sampled BFS sources, None for exact values (or k from epsilon)
+    - epsilon = float; error bound of the approximation, used if k is None
+    - delta = float; failure probability of the error bound
+    - n_jobs = int; number of processes, -1 for all cores, default 1
+    - seed = int; random seed of the source sampling
+    - block_size = int; number of BFS sources processed at once, default from number of nodes
+    - cache_path = string; optional .npz file caching the result together with the graph fingerprint and node order; 
+      the centralities are recomputed only if the graph (or k, seed) changed and are realigned to the order of G.nodes
+    
+    Return numpy array (len(G.nodes) x 4) with columns degree, closeness, betweenness, eigenvector in the order of G.nodes.
+    '''
+    n = len(G)
+    if n == 0:
+        return np.zeros((0, 4))
+    
+    if k is None and epsilon is not None:
+        k = int(math.ceil(math.log(2*n/delta) / (2*epsilon**2)))
+    if k is not None and k >= n:
+        k = None
+    
+    params = {'k': k, 'seed': None if k is None else seed}
+    if cache_path is not None:
+        centralities = load_cached_centralities(cache_path, G, params)
+        if centralities is not None:
+            return centralities
+    
+    A = nx.adjacency_matrix(G, weight=None).astype(float).tocsr()
+    
+    degs = np.fromiter((d for node, d in G.degree()), dtype=float, count=n)
+    degs = degs/(degs.max() or 1)
+    
+    clos, betw = closeness_betweenness(A, G.is_directed(), k=k, n_jobs=n_jobs, seed=seed, block_size=block_size)
+    
+    eigen = eigenvector_centrality_sparse(A)
+    
+    centralities = np.column_stack([degs, clos, betw, eigen])
+    if cache_path is not None:
+        store_cached_centralities(cache_path, G, centralities, params)
+    
+    return centralities
 
-    feature_dict = dict(zip(d_deghubs_sorted.keys(), zip(d_deghubs_sorted.values(),d_clos_sorted.values(),d_betw_sorted.values(),d_eigen_sorted.values())))
 
-    feature_dict_sorted = {key:feature_dict[key] for key in G.nodes()}
+def closeness_betweenness(A, directed=False, k=None, n_jobs=None, seed=None, block_size=None):
+    '''
+    Closeness and normalized betweenness centrality from blocks of breadth-first searches (unweighted).
+    Shortest path counts and dependencies (Brandes) are accumulated level by level for a whole block of sources.
+    Input: 
+    - A = Adjacency matrix (scipy.sparse matrix), A[u,v] != 0 for an edge u->v
+    - directed = bool; graph is directed 
+    - k = int; number of sampled sources, None or k >= n for exact values 
+    - n_jobs = int; number of processes, -1 for all cores, default 1
+    - seed = int; random seed of the source sampling
+    - block_size = int; number of BFS sources processed at once
     
-    return feature_dict_sorted
+    Return two numpy arrays; closeness, betweenness. 
+    '''
+    A = sp.csr_matrix(A, dtype=float)
+    n = A.shape[0]
+    AT = A.T.tocsr()
+    
+    sampled = k is not None and k < n
+    if sampled:
+        sources = np.sort(np.random.default_rng(seed).choice(n, size=k, replace=False))
+    else:
+        sources = np.arange(n)
+    
+    if block_size is None:
+        block_size = int(min(256, max(1, 4e6 // n)))
+    blocks = [sources[i:i+block_size] for i in range(0, len(sources), block_size)]
+    
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 1 or len(blocks) == 1:
+        _init_centrality_worker(A, AT, directed)
+        results = [_centrality_block(block, sampled) for block in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_centrality_worker, initargs=(A, AT, directed)) as executor:
+            results = list(executor.map(_centrality_block, blocks, [sampled]*len(blocks)))
+    
+    betw = np.zeros(n)
+    clos = np.zeros(n)
+    count, dist_sum = np.zeros(n), np.zeros(n)
+    for block, (block_clos, block_betw, block_count, block_dist_sum) in zip(blocks, results):
+        betw += block_betw
+        if sampled:
+            count += block_count
+            dist_sum += block_dist_sum
+        else:
+            clos[block] = block_clos
+    
+    if sampled:
+        # fraction of reachable nodes and their mean distance, estimated from the sources 
+        k_other = len(sources) - np.isin(np.arange(n), sources)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            clos = np.where(dist_sum > 0, count/dist_sum * count/np.maximum(k_other, 1), 0.0)
+    
+    if n > 2:
+        betw *= 1.0/((n-1)*(n-2))
+        if sampled:
+            betw *= n/len(sources)
+    
+    return clos, betw
+
+
+_centrality_graph = None
+
+def _init_centrality_worker(A, AT, directed):
+    global _centrality_graph
+    _centrality_graph = (A, AT, directed)
+
+
+def _centrality_block(sources, sampled):
+    '''
+    BFS from a block of sources. 
+    Return closeness of the sources (exact mode), betweenness contribution of the sources, 
+    number of sources reaching each node and sum of their distances (sampled mode).
+    '''
+    A, AT, directed = _centrality_graph
+    n = A.shape[0]
+    b = len(sources)
+    rows = np.arange(b)
+    
+    dist = csgraph.shortest_path(A, method='D', directed=True, unweighted=True, indices=sources)
+    reached = np.isfinite(dist)
+    level = np.where(reached, dist, -1).astype(np.int64)
+    max_level = level.max()
+    
+    # number of shortest paths from each source 
+    sigma = np.zeros((b, n))
+    sigma[rows, sources] = 1.0
+    for L in range(1, max_level+1):
+        front = np.where(level == L-1, sigma, 0.0)
+        sigma = np.where(level == L, AT.dot(front.T).T, sigma)
+    
+    # dependencies, accumulated from the farthest level back to the sources
+    dep = np.zeros((b, n))
+    for L in range(max_level, 0, -1):
+        coef = np.where(level == L, (1.0+dep)/np.where(sigma > 0, sigma, 1.0), 0.0)
+        dep = np.where(level == L-1, sigma*A.dot(coef.T).T, dep)
+    dep[rows, sources] = 0.0
+    betw = dep.sum(axis=0)
+    
+    clos = count = dist_sum = None
+    if sampled:
+        # distances from the sources to each node (= incoming distances of the nodes)
+        count = (reached & (dist > 0)).sum(axis=0).astype(float)
+        dist_sum = np.where(reached, dist, 0.0).sum(axis=0)
+    else:
+        # closeness of the sources uses incoming distances, as networkx
+        if directed:
+            dist = csgraph.shortest_path(AT, method='D', directed=True, unweighted=True, indices=sources)
+            reached = np.isfinite(dist)
+        n_reached = reached.sum(axis=1) - 1.0
+        total = np.where(reached, dist, 0.0).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            clos = np.where(total > 0, n_reached/total, 0.0)
+        if n > 1:
+            clos *= n_reached/(n-1)
+    
+    return clos, betw, count, dist_sum
+
+
+def eigenvector_centrality_sparse(A, max_iter=100, tol=1.0e-6):
+    '''
+    Eigenvector centrality by sparse power iteration of A^T + I, with the start vector, 
+    normalization and stopping rule of networkx.eigenvector_centrality.
+    Input: 
+    - A = Adjacency matrix (scipy.sparse matrix)
+    - max_iter = int; maximum number of iterations
+    - tol = float; error tolerance used to check convergence
+    
+    Return numpy array with eigenvector centralities.
+    '''
+    n = A.shape[0]
+    M = (sp.csr_matrix(A.T, dtype=float) + sp.identity(n, format='csr')).tocsr()
+    
+    x = np.full(n, 1.0/n)
+    for i in range(max_iter):
+        xlast = x
+        x = M.dot(xlast)
+        x = x/(np.linalg.norm(x) or 1)
+        if np.abs(x - xlast).sum() < n*tol:
+            return x
+        
+    raise nx.PowerIterationFailedConvergence(max_iter)
 
 
 
-def rnd_walk_matrix2(A, r, a, num_nodes):
+def rnd_walk_matrix2(A, r, a, num_nodes, sparse=False, solver='power', tol=1e-10):
     '''
     Random Walk Operator with restart probability.
     Input: 
@@ -76,15 +275,21 @@ def rnd_walk_matrix2(A, r, a, num_nodes):
     - r = restart parameter e.g. 0.9
     - a = teleportation value e.g. 1.0 for max. teleportation
     - num_nodes = all nodes included in Adjacency matrix, e.g. amount of all nodes in the graph 
+    - sparse = bool; if True the matrix is computed with rnd_walk_matrix_sparse instead of a dense inverse
+    - solver = string; solver of the sparse mode, 'power' (default), 'splu' or 'gmres', see rwr_column_blocks
+    - tol = float; tolerance of the iterative solvers in sparse mode
 
     Return Matrix with visiting probabilites (non-symmetric!!).
     ''' 
+    if sparse:
+        return rnd_walk_matrix_sparse(A, r, a, num_nodes, solver=solver, tol=tol)
+
     n = num_nodes
     factor = float((1-a)/n)
 
     E = np.multiply(factor,np.ones([n,n]))              # prepare 2nd scaling term
     A_tele = np.multiply(a,A) + E  #     print(A_tele)
-    M = normalize(A_tele, norm='l1', axis=0)                                 # column wise normalized MArkov matrix
+    M = preprocessing.normalize(A_tele, norm='l1', axis=0)                                 # column wise normalized MArkov matrix
 
     # mixture of Markov chains
     del A_tele
@@ -102,6 +307,318 @@ def rnd_walk_matrix2(A, r, a, num_nodes):
     return W
 
 
+def rwr_operator(A, a, num_nodes):
+    '''
+    Sparse form of the column normalized Markov matrix used in rnd_walk_matrix2.
+    The teleportation term is not stored as dense n x n matrix, but kept as rank-one term, i.e. M = S + f * 1 v^T.
+    Input: 
+    - A = Adjacency matrix (numpy array or scipy.sparse matrix)
+    - a = teleportation value e.g. 1.0 for max. teleportation
+    - num_nodes = all nodes included in Adjacency matrix
+    
+    Return sparse matrix S (csr), teleportation factor f and column weights v.
+    '''
+    n = num_nodes
+    factor = float((1-a)/n)
+    
+    A = sp.csr_matrix(A, dtype=float)
+    colsum = a*np.asarray(abs(A).sum(axis=0)).ravel() + factor*n
+    
+    v = np.zeros(n)
+    v[colsum != 0] = 1.0/colsum[colsum != 0]           # l1 norm per column, empty columns stay zero
+    S = (a*A).dot(sp.diags(v)).tocsr()
+    
+    return S, factor, v 
+
+
+def rwr_factorize(A, r, a, num_nodes):
+    '''
+    Factorize I-(1-r)M once with a sparse LU decomposition.
+    The rank-one teleportation term of M is added by Sherman-Morrison, see rwr_operator. 
+    Input: 
+    - A = Adjacency matrix (numpy array or scipy.sparse matrix)
+    - r = restart parameter e.g. 0.9
+    - a = teleportation value e.g. 1.0 for max. teleportation
+    - num_nodes = all nodes included in Adjacency matrix
+    
+    Return function, taking a list of seed node indices and returning the corresponding 
+    columns (n x len(seeds) array) of the Random Walk with Restart matrix.
+    '''
+    n = num_nodes
+    S, factor, v = rwr_operator(A, a, n)
+    
+    # I-(1-r)M = B - (1-r) f 1 v^T, with sparse B
+    B = (sp.identity(n, format='csc') - (1-r)*S).tocsc()
+    lu = spla.splu(B, permc_spec='MMD_AT_PLUS_A') # B is structurally symmetric, COLAMD ordering gives heavy fill-in
+    y = lu.solve(np.full(n, factor))
+    denom = 1.0 - (1-r)*v.dot(y)
+    
+    def solve(cols):
+        E = np.zeros((n, len(cols)))
+        E[cols, np.arange(len(cols))] = 1.0
+        X = lu.solve(E)
+        X += np.outer(y, (1-r)*v.dot(X)/denom)
+        X *= r
+        return X
+    
+    return solve
+
+
+RWR_SOLVERS = ('splu', 'gmres', 'power')
+
+
+def rwr_column_blocks(A, r, a, num_nodes, solver='power', tol=1e-10, maxiter=1000, block_size=256, seeds=None):
+    '''
+    Compute columns of the Random Walk with Restart matrix block by block, 
+    without building any dense n x n matrix.
+    Input: 
+    - A = Adjacency matrix (numpy array or scipy.sparse matrix)
+    - r = restart parameter e.g. 0.9
+    - a = teleportation value e.g. 1.0 for max. teleportation
+    - num_nodes = all nodes included in Adjacency matrix
+    - solver = string; 'power' (power iteration per block, converges with rate 1-r, fastest for the default r=0.9), 
+      'splu' (sparse LU factorization, solved once, preferable for small r) or 'gmres' (restarted GMRES per column)
+    - tol = float; tolerance of the iterative solvers
+    - maxiter = int; maximum number of iterations of the iterative solvers
+    - block_size = int; number of seed columns computed at once
+    - seeds = optional list of column indices (seed nodes); default all nodes
+    
+    Return generator of tuples (column indices, n x block array with visiting probabilities), matching rnd_walk_matrix2 columns.
+    Raises ValueError for an unknown solver.
+    '''
+    if solver not in RWR_SOLVERS:
+        raise ValueError('Please choose a solver by setting solver="splu", "gmres" or "power".')
+    
+    n = num_nodes
+    if seeds is None:
+        seeds = np.arange(n)
+    
+    return _rwr_column_blocks(A, r, a, n, solver, tol, maxiter, block_size, np.asarray(seeds))
+
+
+def _rwr_column_blocks(A, r, a, n, solver, tol, maxiter, block_size, seeds):
+    
+    S, factor, v = rwr_operator(A, a, n)
+    
+    if solver == 'splu':
+        solve = rwr_factorize(A, r, a, n)
+        for i in range(0, len(seeds), block_size):
+            cols = seeds[i:i+block_size]
+            yield cols, solve(cols)
+    
+    elif solver == 'gmres':
+        op = spla.LinearOperator((n, n), matvec=lambda x: x - (1-r)*(S.dot(x) + factor*v.dot(x)), dtype=float)
+        
+        for i in range(0, len(seeds), block_size):
+            cols = seeds[i:i+block_size]
+            X = np.zeros((n, len(cols)))
+            for ix, c in enumerate(cols):
+                e = np.zeros(n)
+                e[c] = 1.0
+                try:
+                    x, info = spla.gmres(op, e, rtol=tol, restart=50, maxiter=maxiter)
+                except TypeError: # scipy < 1.12
+                    x, info = spla.gmres(op, e, tol=tol, restart=50, maxiter=maxiter)
+                if info > 0:
+                    print('GMRES did not converge for column', c)
+                X[:, ix] = x
+            yield cols, r*X
+    
+    elif solver == 'power':
+        # W = r*I + (1-r)*M*W, converges with rate (1-r)
+        for i in range(0, len(seeds), block_size):
+            cols = seeds[i:i+block_size]
+            E = np.zeros((n, len(cols)))
+            E[cols, np.arange(len(cols))] = r
+            X = E.copy()
+            for itr in range(maxiter):
+                X_new = E + (1-r)*(S.dot(X) + factor*v.dot(X)[np.newaxis, :])
+                delta = np.abs(X_new - X).max()
+                X = X_new
+                if delta < tol:
+                    break
+            else:
+                print('Power iteration did not converge within maxiter.')
+            yield cols, X
+
+
+def rnd_walk_matrix_sparse(A, r, a, num_nodes, solver='power', tol=1e-10, maxiter=1000, block_size=256):
+    '''
+    Random Walk Operator with restart probability, computed on a sparse adjacency matrix.
+    Same result as rnd_walk_matrix2 (up to tol), without the dense teleportation matrix and dense inverse.
+    Input: 
+    - A = Adjacency matrix (numpy array or scipy.sparse matrix)
+    - r = restart parameter e.g. 0.9
+    - a = teleportation value e.g. 1.0 for max. teleportation
+    - num_nodes = all nodes included in Adjacency matrix
+    - solver = string; 'power', 'splu' or 'gmres', see rwr_column_blocks
+    - tol = float; tolerance of the iterative solvers
+    - maxiter = int; maximum number of iterations of the iterative solvers
+    - block_size = int; number of columns solved at once
+    
+    Return Matrix with visiting probabilites (non-symmetric!!).
+    '''
+    blocks = rwr_column_blocks(A, r, a, num_nodes, solver, tol, maxiter, block_size)
+    
+    W = np.zeros((num_nodes, num_nodes))
+    for cols, block in blocks:
+        W[:, cols] = block
+        
+    return W
+
+
+def rnd_walk_matrix_blocked(A, r, a, num_nodes, n_jobs=None, mem_budget=1024, out=None, memmap_path=None):
+    '''
+    Random Walk Operator with restart probability, computed in parallel blocks of seed columns.
+    I-(1-r)M is factorized once (see rwr_factorize) and blocks of columns are solved in a thread pool 
+    sharing the factorization. Each block is written directly into the preallocated output.
+    Input: 
+    - A = Adjacency matrix (numpy array or scipy.sparse matrix)
+    - r = restart parameter e.g. 0.9
+    - a = teleportation value e.g. 1.0 for max. teleportation
+    - num_nodes = all nodes included in Adjacency matrix
+    - n_jobs = int; number of threads, default all cores 
+    - mem_budget = float; memory in MB for the blocks solved at the same time (output excluded)
+    - out = optional preallocated n x n array (Fortran order recommended) to be filled
+    - memmap_path = optional file path; output is written to a .npy memmap (Fortran order) instead of memory
+    
+    Return Matrix with visiting probabilites (non-symmetric!!), same as rnd_walk_matrix2.
+    '''
+    n = num_nodes
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    
+    # right hand side, solution and correction term per column in a block, float64
+    block_size = int(mem_budget*2**20 / (3*8*n*n_jobs))
+    block_size = min(max(block_size, 1), n)
+    
+    if out is None and memmap_path is not None:
+        out = np.lib.format.open_memmap(memmap_path, mode='w+', dtype=np.float64, shape=(n, n), fortran_order=True)
+    elif out is None:
+        out = np.empty((n, n), order='F')
+        
+    solve = rwr_factorize(A, r, a, n)
+    
+    def solve_block(start):
+        cols = np.arange(start, min(start+block_size, n))
+        out[:, cols[0]:cols[-1]+1] = solve(cols)
+    
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        list(executor.map(solve_block, range(0, n, block_size)))
+        
+    if isinstance(out, np.memmap):
+        out.flush()
+    
+    return out
+
+
+def sparsify_rows(X, k=None, eps=None):
+    '''
+    Keep only the largest entries of each row of a matrix.
+    Input: 
+    - X = numpy array (e.g. visiting probabilities with seed nodes as rows)
+    - k = int; number of entries kept per row (top-k), None keeps all 
+    - eps = float; entries not above eps are dropped, None drops only zeros
+    
+    Return sparse matrix (csr) with same shape as X. 
+    '''
+    X = np.asarray(X)
+    m, n = X.shape
+    
+    if k is not None and k < n:
+        cols = np.argpartition(-X, k-1, axis=1)[:, :k]
+        vals = np.take_along_axis(X, cols, axis=1).ravel()
+        rows = np.repeat(np.arange(m), k)
+        cols = cols.ravel()
+    else:
+        vals = X.ravel()
+        rows = np.repeat(np.arange(m), n)
+        cols = np.tile(np.arange(n), m)
+    
+    if eps is not None:
+        keep = vals > eps
+    else:
+        keep = vals != 0
+        
+    return sp.csr_matrix((vals[keep], (rows[keep], cols[keep])), shape=(m, n))
+
+
+def rnd_walk_matrix_topk(A, r, a, num_nodes, k=None, eps=None, solver='power', tol=1e-10, block_size=256):
+    '''
+    Sparsified Random Walk with Restart feature matrix. 
+    Visiting probabilities are computed block-wise (see rwr_column_blocks) and only the top-k entries 
+    and/or entries above eps are kept per seed node, so memory is O(n*k) instead of O(n^2). 
+    Input: 
+    - A = Adjacency matrix (numpy array or scipy.sparse matrix)
+    - r = restart parameter e.g. 0.9
+    - a = teleportation value e.g. 1.0 for max. teleportation
+    - num_nodes = all nodes included in Adjacency matrix
+    - k = int; number of visiting probabilities kept per node
+    - eps = float; minimal visiting probability kept 
+    - solver = string; 'power', 'splu' or 'gmres', see rwr_column_blocks
+    - tol = float; tolerance of the iterative solvers
+    - block_size = int; number of seed nodes computed at once
+    
+    Return sparse matrix (csr) with seed nodes as rows, i.e. the transposed (sparsified) output of rnd_walk_matrix2. 
+    '''
+    blocks = []
+    for cols, block in rwr_column_blocks(A, r, a, num_nodes, solver=solver, tol=tol, block_size=block_size):
+        blocks.append(sparsify_rows(block.T, k, eps))
+        
+    return sp.vstack(blocks, format='csr')
+
+
+def rnd_walk_matrix_update(W, A_old, A_new, r, a, num_nodes, n_check=16, seed=None, inplace=False):
+    '''
+    Update a Random Walk with Restart matrix after a small edit of the network (added/removed edges or changed weights),
+    without recomputing it. Only the columns of the Markov matrix M belonging to changed adjacency columns differ, 
+    i.e. I-(1-r)M changes by a matrix of rank c = number of changed columns, which is applied with the 
+    Sherman-Morrison-Woodbury formula in O(n^2 c). 
+    The error is estimated by recomputing n_check columns (all changed columns plus a random sample) by power iteration.
+    Input: 
+    - W = previous result of rnd_walk_matrix2 (numpy array, not transposed)
+    - A_old = Adjacency matrix W was computed from (numpy array or scipy.sparse matrix)
+    - A_new = Adjacency matrix after the edit, same node order and number of nodes
+    - r = restart parameter e.g. 0.9
+    - a = teleportation value e.g. 1.0 for max. teleportation
+    - num_nodes = all nodes included in Adjacency matrix
+    - n_check = int; number of randomly sampled columns compared to an exact solve, 0 to skip the check
+    - seed = int; random seed of the sampled columns
+    - inplace = bool; overwrite W instead of returning a copy
+    
+    Return updated Matrix with visiting probabilites (non-symmetric!!) and the relative error of the checked columns
+    compared to a full recompute (Frobenius norm; None if not checked).
+    '''
+    n = num_nodes
+    A_old = sp.csr_matrix(A_old, dtype=float)
+    A_new = sp.csr_matrix(A_new, dtype=float)
+    
+    cols = np.unique((A_new - A_old).tocoo().col)
+    if not inplace:
+        W = np.array(W, dtype=float)
+    
+    if len(cols) > 0:
+        S_old, factor, v_old = rwr_operator(A_old, a, n)
+        S_new, factor, v_new = rwr_operator(A_new, a, n)
+        
+        # M_new = M_old + U E^T, with E selecting the changed columns 
+        U = (S_new[:, cols] - S_old[:, cols]).toarray() + factor*(v_new[cols] - v_old[cols])[np.newaxis, :]
+        
+        # W_new = W + (1-r)/r * W U K^-1 W[cols,:],  K = I - (1-r)/r * W[cols,:] U
+        WU = W.dot(U)
+        K = np.identity(len(cols)) - (1-r)/r*W[cols, :].dot(U)
+        W += ((1-r)/r)*WU.dot(np.linalg.solve(K, W[cols, :]))
+    
+    error = None
+    if n_check > 0:
+        rng = np.random.default_rng(seed)
+        check = np.union1d(cols, rng.choice(n, size=min(n_check, n), replace=False))
+        W_exact = np.hstack([block for c, block in rwr_column_blocks(A_new, r, a, n, solver='power', tol=1e-14, seeds=check)])
+        error = np.linalg.norm(W[:, check] - W_exact) / np.linalg.norm(W_exact)
+    
+    return W, error
+
+
 def bin_nodes(data_dict): 
     '''
     Binning nodes based on unique values in dictionary input. 
@@ -8,22 +8,161 @@
 
 import plotly
 import plotly.graph_objs as pgo
-import umap as umap 
 #import umap.parametric_umap as umap
-from sklearn.manifold import TSNE
-from sklearn import preprocessing
 from numpy import pi, cos, sin, arccos, arange
 import math 
+import collections
+import threading
+import numpy as np
+import pandas as pd
 import networkx as nx
-from shapely import geometry
+import scipy.sparse as sp
 
-from cartoGRAPHs import *
+from cartoGRAPHs._lazy import lazy_import
 from cartoGRAPHs.func_visual_properties import *
+from cartoGRAPHs.func_layout import *
+from cartoGRAPHs.func_cache import matrix_fingerprint
+
+# heavy dependencies, imported on first use 
+umap = lazy_import('umap')
+manifold = lazy_import('sklearn.manifold')
+preprocessing = lazy_import('sklearn.preprocessing')
+neighbors = lazy_import('sklearn.neighbors')
+geometry = lazy_import('shapely.geometry')
 
 ########################################################################################
 
 
         
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+# E X E C U T I O N  M O D E 
+
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+# 'reproducible' : fixed random state, same layout in every run (UMAP then runs single threaded)
+# 'fast' : no random state, UMAP and the neighbor search run in parallel on all cores (numba)
+UMAP_SEED = 42
+TSNE_SEED = 0
+
+
+def execution_params(mode='reproducible', seed=UMAP_SEED):
+    '''
+    Random state and number of jobs of an execution mode.
+    Input: 
+    - mode = string; 'reproducible' (fixed seed, single threaded) or 'fast' (no seed, all cores)
+    - seed = int; random state of the reproducible mode
+    
+    Return dict with keys random_state and n_jobs.
+    '''
+    if mode == 'fast':
+        return dict(random_state=None, n_jobs=-1)
+    
+    if mode != 'reproducible':
+        print('Please choose mode="reproducible" or mode="fast". Continuing with mode="reproducible".')
+    return dict(random_state=seed, n_jobs=1)
+
+
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+# k N N  C A C H E 
+
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+# UMAP computes exact pairwise distances below this number of samples; 
+# the approximate (NN-descent) neighbor search is only run for larger matrices.
+# Sharing the search (share_knn=True of the UMAP embeddings) is opt-in : UMAP's random state is then not 
+# consumed by the search, so the embeddings differ from plain UMAP with the same seed (still deterministic).
+KNN_MIN_SAMPLES = 4096
+KNN_CACHE_MAXBYTES = 256 * 2**20   # neighbor indices and distances only, no search index / copy of the matrix
+
+_knn_cache = collections.OrderedDict()
+_knn_lock = threading.Lock()
+
+
+def get_precomputed_knn(Matrix, n_neighbors, metric='cosine', seed=UMAP_SEED, n_jobs=1, search_index=False):
+    '''
+    Nearest neighbor search of the rows of Matrix, shared by all UMAP embeddings of the same matrix.
+    Neighbor indices and distances are kept in a small LRU cache (at most KNN_CACHE_MAXBYTES) 
+    keyed by (matrix fingerprint, metric, n_neighbors, seed).
+    Input: 
+    - Matrix = feature matrix (pd.DataFrame, numpy array or scipy sparse matrix)
+    - n_neighbors = int; number of neighbors 
+    - metric = string; e.g. cosine, euclidean 
+    - seed = int; random state of the neighbor search (None: not reproducible)
+    - n_jobs = int; number of threads of the neighbor search (-1: all cores)
+    - search_index = bool; also return the search index (needed for UMAP transform). The index holds a copy 
+      of the matrix and is never cached, so the search is run again.
+    
+    Return tuple (knn_indices, knn_dists, knn_search_index) to be passed to umap.UMAP(precomputed_knn=...)
+    or (None, None, None) for matrices below KNN_MIN_SAMPLES rows.
+    '''
+    
+    if Matrix.shape[0] < KNN_MIN_SAMPLES:
+        return (None, None, None)
+    
+    key = (matrix_fingerprint(Matrix), metric, n_neighbors, seed)
+    with _knn_lock:
+        knn = _knn_cache.get(key)
+        if knn is not None:
+            _knn_cache.move_to_end(key)
+    
+    knn_search_index = None
+    if knn is not None and not search_index:
+        knn_indices, knn_dists = knn
+        
+    else:
+        # same input conversion as umap.UMAP.fit
+        if sp.issparse(Matrix):
+            X = sp.csr_matrix(Matrix, dtype=np.float32)
+            X.sort_indices()
+            # pynndescent's sparse kernels are compiled for int32 indices
+            X.indices = X.indices.astype(np.int32)
+            X.indptr = X.indptr.astype(np.int32)
+        else:
+            X = np.ascontiguousarray(Matrix, dtype=np.float32)
+        
+        angular = metric in ('cosine', 'correlation', 'dice', 'jaccard', 'll_dirichlet', 'hellinger')
+        random_state = np.random.RandomState(seed)
+        knn_indices, knn_dists, knn_search_index = umap.umap_.nearest_neighbors(
+            X, n_neighbors, metric, {}, angular, random_state, 
+            low_memory=True, use_pynndescent=True, n_jobs=n_jobs)
+        del X
+        if not search_index:
+            knn_search_index = None
+        
+        nbytes = knn_indices.nbytes + knn_dists.nbytes
+        with _knn_lock:
+            if nbytes <= KNN_CACHE_MAXBYTES:
+                _knn_cache[key] = (knn_indices, knn_dists)
+            while sum(i.nbytes + d.nbytes for i, d in _knn_cache.values()) > KNN_CACHE_MAXBYTES:
+                _knn_cache.popitem(last=False)
+    
+    # UMAP marks disconnected neighbors in place, hand out copies 
+    return (knn_indices.copy(), knn_dists.copy(), knn_search_index)
+
+
+def _shared_knn(share_knn, Matrix, n_neighbors, metric, execution, search_index):
+    '''
+    precomputed_knn argument of umap.UMAP; no precomputed neighbors unless share_knn.
+    '''
+    if not share_knn:
+        return (None, None, None)
+    return get_precomputed_knn(Matrix, n_neighbors, metric, execution['random_state'], execution['n_jobs'], search_index)
+
+
+def clear_knn_cache():
+    '''
+    Remove all cached nearest neighbor searches.
+    '''
+    with _knn_lock:
+        _knn_cache.clear()
+
+
 # -------------------------------------------------------------------------------------
 # -------------------------------------------------------------------------------------
 
@@ -32,15 +171,19 @@ from cartoGRAPHs.func_visual_properties import *
 # -------------------------------------------------------------------------------------
 # -------------------------------------------------------------------------------------
 
-def embed_tsne_2D(Matrix, prplxty, density, l_rate, steps, metric = 'precomputed'):
+def embed_tsne_2D(Matrix, prplxty, density, l_rate, steps, metric = 'precomputed', mode = 'reproducible'):
     '''
     Dimensionality reduction from Matrix using t-SNE.
+    Optional: mode = 'reproducible' or 'fast', see execution_params.
     Return dict (keys: node IDs, values: x,y).
     ''' 
     
-    tsne = TSNE(n_components = 2, random_state = 0, perplexity = prplxty, metric = metric, init='pca',
+    execution = execution_params(mode, TSNE_SEED)
+    tsne = manifold.TSNE(n_components = 2, perplexity = prplxty, metric = metric, init='pca', **execution,
                      early_exaggeration = density,  learning_rate = l_rate ,n_iter = steps,
                      square_distances=True)
+    if sp.issparse(Matrix):
+        tsne.set_params(init='random')   # PCA initialization does not support sparse input
     
     embed = tsne.fit_transform(Matrix)
     
@@ -48,86 +191,279 @@ def embed_tsne_2D(Matrix, prplxty, density, l_rate, steps, metric = 'precomputed
 
 
 
-def embed_umap_2D(Matrix, n_neigh, spre, m_dist, metric='cosine', learn_rate = 1, n_ep = None):
+def embed_umap_2D(Matrix, n_neigh, spre, m_dist, metric='cosine', learn_rate = 1, n_ep = None, init = 'spectral', return_model = False, mode = 'reproducible', share_knn = False):
     '''
     Dimensionality reduction from Matrix using UMAP.
+    Optional: init = 'spectral' or array with start positions (rows of Matrix x 2), see warm_start_init.
+    Optional: return_model = bool; additionally return the fitted UMAP model. 
+    Optional: mode = 'reproducible' or 'fast', see execution_params.
+    Optional: share_knn = bool; reuse the neighbor search of earlier embeddings of Matrix, see get_precomputed_knn.
     Return dict (keys: node IDs, values: x,y).
     ''' 
     n_comp = 2 
-    SEED = 42
+    execution = execution_params(mode)
     U = umap.UMAP(
+        precomputed_knn = _shared_knn(share_knn, Matrix, n_neigh, metric, execution, return_model),
         n_neighbors = n_neigh,
         spread = spre,
         min_dist = m_dist,
         n_components = n_comp,
         metric = metric, 
-        random_state=SEED,
+        **execution,
         learning_rate = learn_rate, 
-        n_epochs = n_ep)
+        n_epochs = n_ep,
+        init = init)
     embed = U.fit_transform(Matrix)
-
+    
+    if return_model:
+        return embed, U
     return embed
 
 
-def embed_tsne_3D(Matrix, prplxty, density, l_rate, n_iter, metric = 'cosine'):
+def embed_tsne_3D(Matrix, prplxty, density, l_rate, n_iter, metric = 'cosine', mode = 'reproducible'):
     '''
     Dimensionality reduction from Matrix (t-SNE).
+    Optional: mode = 'reproducible' or 'fast', see execution_params.
     Return dict (keys: node IDs, values: x,y,z).
     '''
     
-    tsne3d = TSNE(n_components = 3, random_state = 0, perplexity = prplxty,
+    execution = execution_params(mode, TSNE_SEED)
+    tsne3d = manifold.TSNE(n_components = 3, perplexity = prplxty, **execution,
                      early_exaggeration = density,  learning_rate = l_rate, n_iter = n_iter, metric = metric,
                  square_distances=True)
+    if sp.issparse(Matrix):
+        tsne3d.set_params(init='random')   # PCA initialization does not support sparse input
     embed = tsne3d.fit_transform(Matrix)
 
     return embed 
 
 
-def embed_umap_3D(Matrix, n_neighbors, spread, min_dist, metric='cosine', learn_rate = 1, n_ep = None):
+def embed_umap_3D(Matrix, n_neighbors, spread, min_dist, metric='cosine', learn_rate = 1, n_ep = None, init = 'spectral', return_model = False, mode = 'reproducible', share_knn = False):
     '''
     Dimensionality reduction from Matrix (UMAP).
+    Optional: init = 'spectral' or array with start positions (rows of Matrix x 3), see warm_start_init.
+    Optional: return_model = bool; additionally return the fitted UMAP model. 
+    Optional: mode = 'reproducible' or 'fast', see execution_params.
+    Optional: share_knn = bool; reuse the neighbor search of earlier embeddings of Matrix, see get_precomputed_knn.
     Return dict (keys: node IDs, values: x,y,z).
     '''
 
     n_components = 3 # for 3D
+    execution = execution_params(mode)
 
     U_3d = umap.UMAP(
+        precomputed_knn = _shared_knn(share_knn, Matrix, n_neighbors, metric, execution, return_model),
         n_neighbors = n_neighbors,
         spread = spread,
         min_dist = min_dist,
         n_components = n_components,
         metric = metric,
-        random_state=42,
+        **execution,
         learning_rate = learn_rate, 
-        n_epochs = n_ep)
+        n_epochs = n_ep,
+        init = init)
     embed = U_3d.fit_transform(Matrix)
     
+    if return_model:
+        return embed, U_3d
     return embed
 
 
 
-def embed_umap_sphere(Matrix, n_neighbors, spread, min_dist):
+def embed_umap_sphere(Matrix, n_neighbors, spread, min_dist, mode='reproducible', share_knn=False):
     ''' 
     Generate spherical embedding of nodes in matrix input using UMAP.
     Input: 
     - Matrix = Feature Matrix with either all or specific  nodes (rows) and features (columns) or symmetric (nodes = rows and columns)
     - n_neighbors/spread/min_dist = floats; UMAP parameters.
     - metric = string; e.g. havervine, euclidean, cosine ,.. 
+    - mode = string; 'reproducible' or 'fast', see execution_params
+    - share_knn = bool; reuse the neighbor search of earlier embeddings of Matrix, see get_precomputed_knn 
+      (the returned model then has no search index, i.e. no transform)
     
     Return sphere embedding. 
     '''
     
+    execution = execution_params(mode)
     model = umap.UMAP(
+        precomputed_knn = _shared_knn(share_knn, Matrix, n_neighbors, 'euclidean', execution, False),
         n_neighbors = n_neighbors, 
         spread = spread,
         min_dist = min_dist,
         output_metric = 'haversine',
-        random_state=42)
+        **execution)
     sphere_mapper = model.fit(Matrix)
 
     return sphere_mapper
 
 
+def warm_start_init(G, DM, posG, dim):
+    '''
+    Start positions for an embedding from a previous layout, e.g. of an earlier version of the graph.
+    Nodes of the previous layout keep their position, new nodes are placed at the mean position of their 
+    already placed neighbors (repeated until no more nodes can be placed), remaining nodes at the center.
+    Input: 
+    - G = networkx Graph
+    - DM = Matrix to be embedded (pd.DataFrame with nodes as index, or array with rows in the order of G.nodes())
+    - posG = previous layout (Layout or dictionary with nodes as keys and coordinates as values)
+    - dim = int; 2 or 3 dimensions of the embedding
+    
+    Return numpy array (rows of DM x dim) to be used as UMAP init.
+    '''
+    posG = as_layout(posG)
+    if isinstance(DM, pd.DataFrame):
+        nodes = list(DM.index)
+    else:
+        nodes = list(G.nodes())[:DM.shape[0]]
+    
+    pos = {n: posG.coords[i, :dim] for n, i in posG.index.items()}
+    pending = [n for n in nodes if n not in pos]
+    
+    while pending:
+        placed = {}
+        for n in pending:
+            nbrs = [pos[m] for m in nx.all_neighbors(G, n) if m in pos] if n in G else []
+            if nbrs:
+                placed[n] = np.mean(nbrs, axis=0)
+        if not placed:
+            break
+        pos.update(placed)
+        pending = [n for n in pending if n not in placed]
+    
+    center = posG.coords[:, :dim].mean(axis=0) if len(posG) else np.zeros(dim)
+    init = np.array([pos.get(n, center) for n in nodes], dtype=float).reshape(len(nodes), dim)
+    
+    return init
+
+
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+# P L A C I N G  N E W  N O D E S 
+
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+class EmbeddingModel:
+    '''
+    Embedding a layout was generated from, kept with the layout (posG.model) to place new nodes, see place_nodes.
+    The fitted model and the embedded matrix are only kept with keep_model=True (see keep), and never pickled 
+    with the layout (see Layout.__getstate__).
+    
+    Attributes:
+    - nodes = list of embedded nodes (rows of the embedded matrix) 
+    - offset, scale = numpy arrays; layout coordinates = (embedding coordinates - offset) / scale
+    - geometry = string; 'euclidean' or 'sphere' (embedding in spherical coordinates, see get_posG_sphere_norm)
+    - mapper = fitted umap.UMAP, None if not kept (see keep_model of the UMAP layouts)
+    - data = matrix the embedding was computed from (reference, not a copy), None if not kept; its first len(nodes) rows belong to nodes
+    - metric = string; metric of the embedding, used to find similar nodes in data
+    '''
+    
+    def __init__(self, nodes, offset, scale, geometry='euclidean', mapper=None, data=None, metric='euclidean'):
+        self.nodes = list(nodes)
+        self.offset = np.asarray(offset, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.geometry = geometry
+        self.mapper = mapper
+        self.data = data
+        self.metric = metric
+        self._neighbors = None
+    
+    def __repr__(self):
+        return 'EmbeddingModel(%d nodes, %s, data=%s, mapper=%s)' % (len(self.nodes), self.geometry, type(self.data).__name__, type(self.mapper).__name__)
+    
+    def keep(self, mapper, data):
+        '''
+        Keep the fitted model and the embedded matrix to place new nodes.
+        '''
+        self.mapper = mapper
+        self.data = data
+        self._neighbors = None
+    
+    def to_layout(self, embed, radius=1.0):
+        '''
+        Map embedding coordinates to layout coordinates. 
+        Return numpy array.
+        '''
+        embed = np.asarray(embed, dtype=float)
+        if self.geometry == 'sphere':
+            embed = np.column_stack((np.sin(embed[:, 0]) * np.cos(embed[:, 1]),
+                                     np.sin(embed[:, 0]) * np.sin(embed[:, 1]),
+                                     np.cos(embed[:, 0]))) * np.reshape(radius, (-1, 1))
+        else:
+            embed = embed[:, :len(self.offset)]
+            
+        return (embed - self.offset) / self.scale
+    
+    def neighbors(self):
+        '''
+        Nearest neighbor index over the embedded feature rows (fitted once).
+        '''
+        if self.data is None:
+            raise ValueError('EmbeddingModel has no training data, please generate the layout with keep_model=True to place new nodes.')
+        
+        if self._neighbors is None:
+            data = self.data.values if isinstance(self.data, pd.DataFrame) else self.data
+            metric = self.metric if isinstance(self.metric, str) else 'euclidean'
+            self._neighbors = neighbors.NearestNeighbors(metric=metric, algorithm='brute').fit(data[:len(self.nodes)])
+        return self._neighbors
+
+
+def place_nodes(posG, X, nodes=None, method='knn', k=8, radius=1.0):
+    '''
+    Place new nodes into an existing layout without re-embedding. 
+    The layout must be generated with keep_model=True (see e.g. layout_portrait_umap, layout_geodesic).
+    Input: 
+    - posG = Layout with an embedding model (posG.model)
+    - X = feature rows of the new nodes, same columns as the embedded matrix (pd.DataFrame with nodes as index or numpy array)
+    - nodes = list of node IDs of the rows of X (default: index of X)
+    - method = string; 'knn' (weighted mean position of the k most similar embedded nodes, milliseconds) 
+      or 'transform' (UMAP transform of the new rows into the embedding)
+    - k = int; number of neighbors for method 'knn'
+    - radius = float or array; radius of the new nodes for spherical layouts
+    
+    Return Layout with the new nodes and their coordinates in the space of posG.
+    '''
+    model = getattr(posG, 'model', None)
+    if model is None or (model.mapper is None and model.data is None):
+        print('Please generate the layout with keep_model=True to place new nodes.')
+        return None
+    
+    if nodes is None:
+        nodes = list(X.index) if isinstance(X, pd.DataFrame) else list(range(X.shape[0]))
+    if isinstance(X, pd.DataFrame):
+        X = X.values
+    
+    if method == 'transform':
+        if model.mapper is None:
+            print('Please generate the layout with keep_model=True to place new nodes.')
+            return None
+        coords = model.to_layout(model.mapper.transform(X), radius)
+    
+    elif method == 'knn':
+        k = min(k, len(model.nodes))
+        dist, ind = model.neighbors().kneighbors(X, k)
+        weights = 1.0 / (dist + 1e-9)
+        weights /= weights.sum(axis=1, keepdims=True)
+        
+        coords_train = posG.coords[posG.rows(model.nodes)]
+        if model.geometry == 'sphere':
+            # mean direction of the neighbors on the sphere, at the radius of the new nodes
+            directions = coords_train * model.scale + model.offset
+            directions /= np.maximum(np.linalg.norm(directions, axis=1, keepdims=True), 1e-12)
+            mean = np.einsum('ij,ijk->ik', weights, directions[ind])
+            mean /= np.maximum(np.linalg.norm(mean, axis=1, keepdims=True), 1e-12)
+            coords = (mean * np.reshape(radius, (-1, 1)) - model.offset) / model.scale
+        else:
+            coords = np.einsum('ij,ijk->ik', weights, coords_train[ind])
+    
+    else:
+        print('Please choose method="knn" or method="transform".')
+        return None
+    
+    return Layout(nodes, coords)
+
+
 # -------------------------------------------------------------------------------------
 # -------------------------------------------------------------------------------------
 
@@ -140,14 +476,11 @@ def embed_umap_sphere(Matrix, n_neighbors, spread, min_dist):
 def get_posG_2D(l_nodes, embed):
     '''
     Get 2D coordinates for each node.
-    Return dict with node: x,y coordinates.
+    Return Layout (dict-like) with node: x,y coordinates.
     '''
     
-    posG = {}
-    cc = 0
-    for entz in l_nodes:
-        posG[entz] = (embed[cc,0],embed[cc,1])
-        cc += 1
+    l_nodes = list(l_nodes)
+    posG = Layout(l_nodes, np.asarray(embed)[:len(l_nodes), :2])
 
     return posG
 
@@ -159,211 +492,139 @@ def get_posG_3D(l_genes, embed):
     - l_genes = list of genes
     - embed = embedding from e.g. tSNE , UMAP ,... 
     
-    Return dictionary with nodes as keys and coordinates as values in 3D. 
+    Return Layout (dict-like) with nodes as keys and coordinates as values in 3D. 
     '''
     
-    posG = {}
-    cc = 0
-    for entz in l_genes:
-        posG[entz] = (embed[cc,0],embed[cc,1],embed[cc,2])
-        cc += 1
+    l_genes = list(l_genes)
+    posG = Layout(l_genes, np.asarray(embed)[:len(l_genes), :3])
     
     return posG
 
 
-def get_posG_2D_norm(G, DM, embed, r_scalingfactor=1.05):
+def _split_genes(G, DM):
+    '''
+    Split nodes of G into nodes with a row in DM (in the order of DM) and all other nodes (in the order of G.nodes).
+    Return two lists; genes, genes_rest. Returns None, None for invalid DM.
+    '''
+    nodes = list(G.nodes())
+    
+    if isinstance(DM, pd.DataFrame):
+        genes = [i for i in DM.index if i in G]
+        
+    elif isinstance(DM, np.ndarray) or sp.issparse(DM):
+        # matrix without index, rows in the same order of G.nodes()
+        genes = nodes[:DM.shape[0]]
+    
+    else: 
+        print('Please enter a Matrix of type pd.DataFrame with any number, up to len(G.nodes()) rows and columns or a numpy array with len(G.nodes()) rows and columns in the same order of G.nodes().')
+        return None, None
+    
+    genes_set = set(genes)
+    genes_rest = [i for i in nodes if i not in genes_set]
+    
+    return genes, genes_rest
+
+
+def _minmax_norm(coords, decimals=None, return_params=False):
+    '''
+    Min-max normalize each column of coords to (0,1) in one pass (constant columns become 0).
+    Return numpy array (and the column minima and ranges if return_params).
+    '''
+    mins = coords.min(axis=0)
+    ranges = coords.max(axis=0) - mins
+    ranges[ranges == 0] = 1.0
+    coords_norm = (coords - mins) / ranges
+    
+    if decimals is not None:
+        coords_norm = np.round(coords_norm, decimals)
+    
+    if return_params:
+        return coords_norm, mins, ranges
+    return coords_norm
+
+
+def get_posG_2D_norm(G, DM, embed, r_scalingfactor=1.05, metric='euclidean'):
     '''
     Generate coordinates from embedding. 
     Input:
     - G = Graph
     - DM = matrix; index and columns must be same as G.nodes
     - embed = embedding from e.g. tSNE , UMAP ,... 
+    - metric = string; metric of the embedding, kept with the layout to place new nodes (see place_nodes)
     
-    Return dictionary with nodes as keys and coordinates as values in 3D normed. 
+    Return Layout (dict-like) with nodes as keys and coordinates as values normed. 
     '''
     
-    if isinstance(DM, np.ndarray):
-        df_DM = pd.DataFrame(DM, index=list(G.nodes()), columns=list(G.nodes()))
-        DM = df_DM
-        
-    elif isinstance(DM, pd.DataFrame):
-        DM = DM 
+    genes, genes_rest = _split_genes(G, DM)
+    if genes is None:
+        return None
     
-    else: 
-        print('Please enter a Matrix of type pd.DataFrame with any number, up to len(G.nodes()) rows and columns or a numpy array with len(G.nodes()) rows and columns in the same order of G.nodes().')
+    embed = np.asarray(embed, dtype=float)[:len(genes), :2]
         
-        
-    genes = []
-    for i in DM.index:
-        if i in G.nodes(): #if str(i) in G.nodes() or int(i) in G.nodes():
-            #genes.append(str(i))
-            genes.append(i)
-
-    genes_rest = [] 
-    for i in G.nodes():
-        if i not in genes:
-            #genes_rest.append(str(i))
-            genes_rest.append(i)
-
-    posG = {}
-    cc = 0
-    for entz in genes:
-        posG[entz] = (embed[cc,0],embed[cc,1])
-        cc += 1
-
     #--------------------------------------------------------------
     # REST (if genes = G.nodes then rest will be ignored / empty)
     
     # generate circle coordinates for rest genes (without e.g. GO term or Disease Annotation)
     t = np.random.uniform(0,2*np.pi,len(genes_rest))
     
-    xx=[]
-    yy=[]
-    for i in posG.values():
-        xx.append(i[0])
-        yy.append(i[1])
-    
-    cx = np.mean(xx)
-    cy = np.mean(yy)
-
-    xm, ym = max(posG.values())
+    cx, cy = embed.mean(axis=0)
+    xm, ym = embed[np.lexsort(embed.T[::-1])[-1]] # = max(posG.values()), i.e. node with max x (ties by y)
     r = (math.sqrt((xm-cx)**2 + (ym-cy)**2))*r_scalingfactor #*1.05 # multiplying with 1.05 makes cirle larger to avoid "outsider nodes/genes"
         
-    x = r*np.cos(t)
-    y = r*np.sin(t)
-    rest = []
-    for i,j in zip(x,y):
-            rest.append((i,j))
-
-    posG_rest = dict(zip(genes_rest, rest))
+    rest = np.column_stack((r*np.cos(t), r*np.sin(t)))
 
-    posG_all = {**posG, **posG_rest}
-    
-    #G_nodes_str = [str(i) for i in list(G.nodes())]
-    posG_complete = {key:posG_all[key] for key in list(G.nodes())}
+    posG_all = Layout(genes + genes_rest, np.vstack((embed, rest)))
+    posG_complete = as_layout(posG_all, list(G.nodes()))
 
     # normalize coordinates 
-    x_list = []
-    y_list = []
-    for k,v in posG_complete.items():
-        x_list.append(v[0])
-        y_list.append(v[1])
-
-    xx_norm = preprocessing.minmax_scale(x_list, feature_range=(0, 1), axis=0, copy=True)
-    yy_norm = preprocessing.minmax_scale(y_list, feature_range=(0, 1), axis=0, copy=True)
-
-    xx_norm_final=[]
-    for i in xx_norm:
-        xx_norm_final.append(round(i,10))
-
-    yy_norm_final=[]
-    for i in yy_norm:
-        yy_norm_final.append(round(i,10))
-
-    posG_complete_norm = dict(zip(list(G.nodes()),zip(xx_norm_final,yy_norm_final)))
+    coords_norm, mins, ranges = _minmax_norm(posG_complete.coords, 10, return_params=True)
+    posG_complete_norm = Layout(posG_complete.nodes, coords_norm)
+    posG_complete_norm.model = EmbeddingModel(genes, mins, ranges, metric=metric)
 
     return posG_complete_norm
 
 
 
-def get_posG_3D_norm(G, DM, embed, r_scalingfactor=1.05):
+def get_posG_3D_norm(G, DM, embed, r_scalingfactor=1.05, metric='euclidean'):
     '''
     Generate coordinates from embedding. 
     Input:
     - G = Graph
     - DM = matrix 
     - embed = embedding from e.g. tSNE , UMAP ,... 
+    - metric = string; metric of the embedding, kept with the layout to place new nodes (see place_nodes)
     
-    Return dictionary with nodes as keys and coordinates as values in 3D normed. 
+    Return Layout (dict-like) with nodes as keys and coordinates as values normed. 
     '''
     
-    if isinstance(DM, np.ndarray):
-        df_DM = pd.DataFrame(DM, index=list(G.nodes()), columns=list(G.nodes()))
-        DM = df_DM
-        
-    elif isinstance(DM, pd.DataFrame):
-        DM = DM 
+    genes, genes_rest = _split_genes(G, DM)
+    if genes is None:
+        return None
     
-    else: 
-        print('Please enter a Matrix of type pd.DataFrame with any number, up to len(G.nodes()) rows and columns or a numpy array with len(G.nodes()) rows and columns in the same order of G.nodes().')
-        
-    genes = []
-    for i in DM.index:
-        if i in G.nodes():
-        #if str(i) in G.nodes() or int(i) in G.nodes():
-            genes.append(i)
-
-    genes_rest = [] 
-    for i in G.nodes():
-        if i not in genes:
-            genes_rest.append(i)
-            
-    posG_3Dumap = {}
-    cc = 0
-    for entz in genes:
-        posG_3Dumap[entz] = (embed[cc,0],embed[cc,1],embed[cc,2])
-        cc += 1
+    embed = np.asarray(embed, dtype=float)[:len(genes), :3]
 
     #--------------------------------------------------------------
     # REST (if genes = G.nodes then rest will be ignored / empty)
     
     # center for sphere to arrange rest gene-datapoints
-    xx=[]
-    yy=[]
-    zz=[]
-    for i in posG_3Dumap.values():
-        xx.append(i[0])
-        yy.append(i[1])
-        zz.append(i[2]) 
-
-    cx = sum(xx)/len(genes)
-    cy = sum(yy)/len(genes)
-    cz = sum(zz)/len(genes)
+    c = embed.mean(axis=0)
 
     # generate spherical coordinates for rest genes (without e.g. GO term or Disease Annotation)
     indices = arange(0, len(genes_rest))
-    phi = arccos(1 - 2*indices/len(genes_rest)) # 2* --> for both halfs of sphere (upper+lower)
+    phi = arccos(1 - 2*indices/max(len(genes_rest),1)) # 2* --> for both halfs of sphere (upper+lower)
     theta = pi * (1 + 5**0.5) * indices
 
-    xm, ym, zm = max(posG_3Dumap.values())
-    r = (math.sqrt((cx - xm)**2 + (cy - ym)**2 + (cz - zm)**2))*r_scalingfactor # +10 > ensure colored nodes within sphere
-    x, y, z = cx+r*cos(theta) * sin(phi),cy+r*sin(theta) * sin(phi), cz+r*cos(phi)
-
-    rest_points = []
-    for i,j,k in zip(x,y,z):
-        rest_points.append((i,j,k))
-
-    posG_rest = dict(zip(genes_rest, rest_points))
+    m = embed[np.lexsort(embed.T[::-1])[-1]] # = max(posG.values())
+    r = np.linalg.norm(c - m)*r_scalingfactor # +10 > ensure colored nodes within sphere
+    rest = c + r*np.column_stack((cos(theta) * sin(phi), sin(theta) * sin(phi), cos(phi)))
 
-    posG_all = {**posG_3Dumap, **posG_rest}
-    posG_3D_complete_umap = {key:posG_all[key] for key in G.nodes()}
+    posG_all = Layout(genes + genes_rest, np.vstack((embed, rest)))
+    posG_3D_complete_umap = as_layout(posG_all, list(G.nodes()))
 
     # normalize coordinates 
-    x_list3D = []
-    y_list3D = []
-    z_list3D = []
-    for k,v in posG_3D_complete_umap.items():
-        x_list3D.append(v[0])
-        y_list3D.append(v[1])
-        z_list3D.append(v[2])
-
-    xx_norm3D = preprocessing.minmax_scale(x_list3D, feature_range=(0, 1), axis=0, copy=True)
-    yy_norm3D = preprocessing.minmax_scale(y_list3D, feature_range=(0, 1), axis=0, copy=True)
-    zz_norm3D = preprocessing.minmax_scale(z_list3D, feature_range=(0, 1), axis=0, copy=True)
-
-    xx_norm3D_final=[]
-    for i in xx_norm3D:
-        xx_norm3D_final.append(round(i,10))
-
-    yy_norm3D_final=[]
-    for i in yy_norm3D:
-        yy_norm3D_final.append(round(i,10))
-
-    zz_norm3D_final=[]
-    for i in zz_norm3D:
-        zz_norm3D_final.append(round(i,10)) 
-
-    posG_3D_complete_umap_norm = dict(zip(list(G.nodes()), zip(xx_norm3D_final,yy_norm3D_final,zz_norm3D_final)))
+    coords_norm, mins, ranges = _minmax_norm(posG_3D_complete_umap.coords, 10, return_params=True)
+    posG_3D_complete_umap_norm = Layout(posG_3D_complete_umap.nodes, coords_norm)
+    posG_3D_complete_umap_norm.model = EmbeddingModel(genes, mins, ranges, metric=metric)
     
     return posG_3D_complete_umap_norm
 
@@ -373,71 +634,42 @@ def get_posG_sphere_norm(G, DM, sphere_mapper, d_param, radius_rest_genes = 1):
     Generate coordinates from embedding. 
     Input:
     - G = Graph 
-    - l_genes = list of node IDs, either specific or all nodes in the graph 
+    - DM = matrix used for the embedding (pd.DataFrame or sparse matrix with rows in the order of G.nodes)
     - sphere_mapper = embedding from UMAP spherical embedding 
     - d_param = dictionary with nodes as keys and assigned radius as values 
     - radius_rest_genes = int; radius in case of genes e.g. not function associated if genes not all G.nodes()
     
-    Return dictionary with nodes as keys and coordinates as values in 3D. 
+    Return Layout (dict-like) with nodes as keys and coordinates as values in 3D. 
     '''
     
-    x = np.sin(sphere_mapper.embedding_[:, 0]) * np.cos(sphere_mapper.embedding_[:, 1])
-    y = np.sin(sphere_mapper.embedding_[:, 0]) * np.sin(sphere_mapper.embedding_[:, 1])
-    z = np.cos(sphere_mapper.embedding_[:, 0])
-    
-    genes = []
-    for i in DM.index:
-        if i in G.nodes():
-            genes.append(i)
+    genes, genes_rest = _split_genes(G, DM)
+    if genes is None:
+        return None
     
-    genes_rest = [] 
-    for i in G.nodes():
-        if i not in genes:
-            genes_rest.append(i)
-    
-    posG_3Dsphere = {}
-    cc = 0
-    for entz in genes:
-        posG_3Dsphere[entz] = (x[cc],y[cc], z[cc])
-        cc += 1
+    embed = sphere_mapper.embedding_[:len(genes)]
+    sphere = np.column_stack((np.sin(embed[:, 0]) * np.cos(embed[:, 1]),
+                              np.sin(embed[:, 0]) * np.sin(embed[:, 1]),
+                              np.cos(embed[:, 0])))
 
     # generate spherical coordinates for rest genes (without e.g. GO term or Disease Annotation)
     indices = arange(0, len(genes_rest))
-    phi = arccos(1 - 2*indices/len(genes_rest))
+    phi = arccos(1 - 2*indices/max(len(genes_rest),1))
     theta = pi * (1 + 5**0.5) * indices
 
     r_rest = radius_rest_genes # radius for rest genes (e.g. if functional layout)
-    x, y, z = r_rest*cos(theta) * sin(phi), r_rest*sin(theta) * sin(phi), r_rest*cos(phi)
-
-    rest_points = []
-    for i,j,k in zip(x,y,z):
-        rest_points.append((i,j,k))
+    rest = r_rest*np.column_stack((cos(theta) * sin(phi), sin(theta) * sin(phi), cos(phi)))
     
-    posG_rest = dict(zip(genes_rest, rest_points))
-    posG_all = {**posG_3Dsphere, **posG_rest}
-            
-    posG_3Dsphere_radius = {}
-    for node,rad in d_param.items():
-        for k,v in posG_all.items():
-            if node == k:
-                posG_3Dsphere_radius[node] = (v[0]*rad, v[1]*rad, v[2]*rad)
- 
-    posG_complete_sphere = {key:posG_3Dsphere_radius[key] for key in G.nodes()}
+    posG_all = Layout(genes + genes_rest, np.vstack((sphere, rest)))
+    posG_all = as_layout(posG_all, list(G.nodes()))
+    
+    # radius of each node, aligned to node order 
+    radius = np.fromiter((d_param[n] for n in posG_all.nodes), dtype=float, count=len(posG_all))
+    posG_complete_sphere = posG_all.coords * radius[:, np.newaxis]
 
     # normalize coordinates 
-    x_list = []
-    y_list = []
-    z_list = []
-    for k,v in posG_complete_sphere.items():
-        x_list.append(v[0])
-        y_list.append(v[1])
-        z_list.append(v[2])
-
-    xx_norm = preprocessing.minmax_scale(x_list, feature_range=(0, 1), axis=0, copy=True)
-    yy_norm = preprocessing.minmax_scale(y_list, feature_range=(0, 1), axis=0, copy=True)
-    zz_norm = preprocessing.minmax_scale(z_list, feature_range=(0, 1), axis=0, copy=True)
-
-    posG_complete_sphere_norm = dict(zip(list(G.nodes()), zip(xx_norm,yy_norm,zz_norm)))
+    coords_norm, mins, ranges = _minmax_norm(posG_complete_sphere, return_params=True)
+    posG_complete_sphere_norm = Layout(posG_all.nodes, coords_norm)
+    posG_complete_sphere_norm.model = EmbeddingModel(genes, mins, ranges, geometry='sphere')
     
     return posG_complete_sphere_norm
 
@@ -452,21 +684,56 @@ def get_posG_sphere_norm(G, DM, sphere_mapper, d_param, radius_rest_genes = 1):
 # -------------------------------------------------------------------------------------
 # -------------------------------------------------------------------------------------
 
-def get_trace_nodes_2D(posG, info_list, color_list, size, linewidth=0.25, opac = 0.9):
+# 2D traces switch from SVG (pgo.Scatter) to WebGL (pgo.Scattergl) rendering above this 
+# number of elements (nodes + edges), SVG gets slow to pan and zoom for large networks
+WEBGL_THRESHOLD = 5000
+
+
+def resolve_backend(n_elements, backend='auto', webgl_threshold=WEBGL_THRESHOLD):
+    '''
+    Choose the rendering backend of 2D traces.
+    Input: 
+    - n_elements = int; number of plotted elements (e.g. nodes + edges)
+    - backend = string; 'auto', 'svg' or 'webgl'
+    - webgl_threshold = int; 'auto' uses WebGL from this number of elements on
+    
+    Return string; 'svg' or 'webgl'.
+    '''
+    if backend == 'auto':
+        return 'webgl' if n_elements >= webgl_threshold else 'svg'
+    elif backend in ('svg', 'webgl'):
+        return backend
+    
+    print('Please choose backend="auto", backend="svg" or backend="webgl". Continuing with backend="auto".')
+    return resolve_backend(n_elements, 'auto', webgl_threshold)
+
+
+def _scatter_2D(n_elements, backend='auto', webgl_threshold=WEBGL_THRESHOLD):
+    '''
+    Return trace class of a 2D scatter trace; pgo.Scatter (SVG) or pgo.Scattergl (WebGL).
+    '''
+    if resolve_backend(n_elements, backend, webgl_threshold) == 'webgl':
+        return pgo.Scattergl
+    return pgo.Scatter
+
+
+def get_trace_nodes_2D(posG, info_list, color_list, size, linewidth=0.25, opac = 0.9, backend = 'auto', webgl_threshold = WEBGL_THRESHOLD):
     '''
     Get trace of nodes for plotting in 2D. 
     Input: 
     - G = Graph
-    - posG = dictionary with nodes as keys and coordinates as values.
+    - posG = Layout or dictionary with nodes as keys and coordinates as values.
     - color_list = list of colors obtained from any color function (see above sections).
     - opacity = transparency of edges e.g. 0.2
+    - backend = string; 'auto', 'svg' or 'webgl' (WebGL from webgl_threshold elements on), see resolve_backend
     
     Return a trace for plotly graph objects plot. 
     '''
     
-    key_list=list(posG.keys())
-    trace = pgo.Scatter(x=[posG[key_list[i]][0] for i in range(len(key_list))],
-                           y=[posG[key_list[i]][1] for i in range(len(key_list))],
+    posG = as_layout(posG)
+    scatter = _scatter_2D(len(posG), backend, webgl_threshold)
+    trace = scatter(x=posG.coords[:,0],
+                           y=posG.coords[:,1],
                            mode = 'markers',
                            text = info_list,
                            hoverinfo = 'text',
@@ -489,7 +756,7 @@ def get_trace_nodes_3D(posG, info_list, color, size, linewidth=0.000001, opac =
     '''
     Get trace of nodes for plotting in 3D. 
     Input: 
-    - posG = dictionary with nodes as keys and coordinates as values.
+    - posG = Layout or dictionary with nodes as keys and coordinates as values.
     - info_list = hover information for each node, e.g. a list sorted according to the initial graph/posG keys
     - color = string; hex color
     - opac = transparency of edges e.g. 0.2
@@ -497,10 +764,10 @@ def get_trace_nodes_3D(posG, info_list, color, size, linewidth=0.000001, opac =
     Return a trace for plotly graph objects plot. 
     '''
     
-    key_list=list(posG.keys())
-    trace = pgo.Scatter3d(x=[posG[key_list[i]][0] for i in range(len(key_list))],
-                           y=[posG[key_list[i]][1] for i in range(len(key_list))],
-                           z=[posG[key_list[i]][2] for i in range(len(key_list))],
+    posG = as_layout(posG)
+    trace = pgo.Scatter3d(x=posG.coords[:,0],
+                           y=posG.coords[:,1],
+                           z=posG.coords[:,2],
                            mode = 'markers',
                            text = info_list,
                            hoverinfo = 'text',
@@ -522,79 +789,71 @@ def get_trace_nodes_3D(posG, info_list, color, size, linewidth=0.000001, opac =
 
 
 
-def get_trace_nodes_2D_legend(posG, info, color, size, legend_names = None, linewidth=0.25, opac = 0.9):
+def _legend_groups(posG, color):
+    '''
+    Group the nodes of a layout by color in one pass over the nodes.
+    Input: 
+    - posG = Layout
+    - color = dictionary with node IDs as keys and colors as values
+    
+    Return list of (color, array of rows in posG) sorted by color in descending order; 
+    nodes without color are left out. 
+    '''
+    if len(posG) == 0:
+        return []
+    
+    d_rows = {col: [] for col in set(color.values())}
+    for row, node in enumerate(posG.nodes):
+        if node in color:
+            d_rows[color[node]].append(row)
+    
+    return [(col, np.array(d_rows[col], dtype=int)) for col in sorted(d_rows, reverse=True)]
+
+
+def get_trace_nodes_2D_legend(posG, info, color, size, legend_names = None, linewidth=0.25, opac = 0.9, backend = 'auto', webgl_threshold = WEBGL_THRESHOLD):
     '''
     Get trace of nodes for plotting in 2D. 
     Input: 
-     - posG = dictionary with nodes as keys and coordinates as values.
+     - posG = Layout or dictionary with nodes as keys and coordinates as values.
     - info = hover information for each node, e.g. a dictionary with node IDs and values = hover information
     - color = a dictionary of key = association name for each color (for legend) and value = hex color  
     - size = a dictionary with node Ids and values=sizes of nodes 
     - legend_names = list of values e.g. strings for each color 
     - linewidth = float; contour of nodes
     - opac = transparency of nodes
+    - backend = string; 'auto', 'svg' or 'webgl' (WebGL from webgl_threshold elements on), see resolve_backend
     
     Return a trace for plotly graph objects plot including a legend. 
     '''
-        # dividing traces based on unique colors > for legend
-    color_dict = {}
-    for i in set(color.values()):
-        sublist = []
-        for k,v in color.items():
-            if v == i: 
-                sublist.append(k)
-        color_dict[i]= sublist
-        
-    # assigning colors to each positioned node 
-    # creating a dictionary with {color: {id:coords}}
-    d_col_pos = {}
-    for i,j_list in color_dict.items(): 
-        sub = {}
-        for ix,(k,v) in enumerate(posG.items()):
-            if k in j_list:
-                #sub[ix] = v
-                sub[k] = v
-            d_col_pos[i] = sub
-    d_col_pos_ordered = dict(sorted(d_col_pos.items(),reverse=True))
+    posG = as_layout(posG)
+    scatter = _scatter_2D(len(posG), backend, webgl_threshold)
+    
+    # dividing traces based on unique colors > for legend
+    groups = _legend_groups(posG, color)
     
     # creating traces 
     traces = []
     if legend_names is not None and color is not None and len(legend_names) == len(set(color.values())): 
-        for elem,(col, dct) in enumerate(d_col_pos_ordered.items()):
-            
-            ids = list(dct.keys())
-            coords = list(dct.values())
-            
-            l_info_sorted_to_ids = [(info[key]) for key in ids] #{key:info[key] for key in ids}            
-            #l_info_sorted_to_ids = list(info_sorted_to_ids.values())
-
-            l_size_sorted_to_ids = [(size[key]) for key in ids] #{key:size[key] for key in ids}
-            #l_size_sorted_to_ids = list(size_sorted_to_ids.values())
-           
-            legendnames_sorted = []
-            for ccc in d_col_pos_ordered.keys():
-                for cl, nm in legend_names.items():
-                    if ccc == cl:
-                        legendnames_sorted.append((cl,nm)) # with Color values
-                        #legendnames_sorted.append(nm) # without Color values
-                        
-            legendnames_sorted 
+        legendnames_sorted = [(col, legend_names[col]) for col, rows in groups if col in legend_names] # with Color values
+        
+        for elem,(col, rows) in enumerate(groups):
+            ids = [posG.nodes[r] for r in rows]
             
-            trace = pgo.Scatter(x=[i[0] for i in coords],
-                                  y=[i[1] for i in coords],
-                                  mode = 'markers',
-                                  text = l_info_sorted_to_ids,
-                                  hoverinfo = 'text',
-                                       marker = dict(
-                            color = col,
-                            size = l_size_sorted_to_ids,
-                            symbol = 'circle',
-                            line = dict(width = linewidth,
-                                    color = 'dimgrey'),
-                            opacity = opac,
-                        ),
-                    name = "Group: "+str(list(legendnames_sorted)[elem]) #legend_names.values())[elem])
-                    )
+            trace = scatter(x=posG.coords[rows,0],
+                            y=posG.coords[rows,1],
+                            mode = 'markers',
+                            text = [info[key] for key in ids],
+                            hoverinfo = 'text',
+                            marker = dict(
+                                color = col,
+                                size = [size[key] for key in ids],
+                                symbol = 'circle',
+                                line = dict(width = linewidth,
+                                            color = 'dimgrey'),
+                                opacity = opac,
+                                ),
+                            name = "Group: "+str(legendnames_sorted[elem])
+                            )
             traces.append(trace)
         return traces 
     
@@ -602,33 +861,24 @@ def get_trace_nodes_2D_legend(posG, info, color, size, legend_names = None, line
         print('Please select a legend which matches the amount of color (i.e. each color shall correspond to an element in the list of legend items).')
         
     else:
-        for elem,(col, dct) in enumerate(d_col_pos_ordered.items()):
-        #for col, dct in d_col_pos_ordered.items():
-        
-            ids = list(dct.keys())
-            coords = list(dct.values())
+        for elem,(col, rows) in enumerate(groups):
+            ids = [posG.nodes[r] for r in rows]
             
-            l_info_sorted_to_ids = [(info[key]) for key in ids] #{key:info[key] for key in ids}            
-            #l_info_sorted_to_ids = list(info_sorted_to_ids.values())
-
-            l_size_sorted_to_ids = [(size[key]) for key in ids] #{key:size[key] for key in ids}
-            #l_size_sorted_to_ids = list(size_sorted_to_ids.values())
-            
-            trace = pgo.Scatter(x=[i[0] for i in coords],
-                                  y=[i[1] for i in coords],
-                                  mode = 'markers',
-                                  text = l_info_sorted_to_ids,
-                                  hoverinfo = 'text',
-                                       marker = dict(
-                            color = col,
-                            size = l_size_sorted_to_ids,
-                            symbol = 'circle',
-                            line = dict(width = linewidth,
-                                    color = 'dimgrey'),
-                            opacity = opac,
-                        ),
-                    name = "Group: "+str(elem) #ids)
-                    )
+            trace = scatter(x=posG.coords[rows,0],
+                            y=posG.coords[rows,1],
+                            mode = 'markers',
+                            text = [info[key] for key in ids],
+                            hoverinfo = 'text',
+                            marker = dict(
+                                color = col,
+                                size = [size[key] for key in ids],
+                                symbol = 'circle',
+                                line = dict(width = linewidth,
+                                            color = 'dimgrey'),
+                                opacity = opac,
+                                ),
+                            name = "Group: "+str(elem)
+                            )
             traces.append(trace)
         return traces 
 
@@ -639,7 +889,7 @@ def get_trace_nodes_3D_legend(posG, info, color, size, legend_names = None, line
     '''
     Get trace of nodes for plotting in 3D. 
     Input: 
-    - posG = dictionary with nodes as keys and coordinates as values.
+    - posG = Layout or dictionary with nodes as keys and coordinates as values.
     - info = hover information for each node, e.g. a dictionary with node IDs and values = hover information
     - color = a dictionary of key = association name for each color (for legend) and value = hex color  
     - size = a dictionary with node Ids and values=sizes of nodes
@@ -650,128 +900,83 @@ def get_trace_nodes_3D_legend(posG, info, color, size, legend_names = None, line
     Return a trace for plotly graph objects plot including a legend. 
     '''
     
+    posG = as_layout(posG)
+    
     # dividing traces based on unique colors > for legend
-    color_dict = {}
-    for i in set(color.values()):
-        sublist = []
-        for k,v in color.items():
-            if v == i: 
-                sublist.append(k)
-        color_dict[i]= sublist
-
-    d_col_pos = {}
-    for i,j_list in color_dict.items(): 
-        sub = {}
-        for ix,(k,v) in enumerate(posG.items()):
-            if k in j_list:
-                #sub[ix] = v
-                sub[k] = v
-            d_col_pos[i] = sub
-    d_col_pos_ordered = dict(sorted(d_col_pos.items(),reverse=True))
+    groups = _legend_groups(posG, color)
     
     # creating traces 
     traces = []
     
     if legend_names is not None and len(legend_names) == len(set(color.values())): 
-       
-        for elem,(col, dct) in enumerate(d_col_pos_ordered.items()):
-            ids = list(dct.keys())
-            coords = list(dct.values())
-            
-            legendnames_sorted = []
-            for ccc in d_col_pos_ordered.keys():
-                for cl, nm in legend_names.items():
-                    if ccc == cl:
-                        legendnames_sorted.append((elem,nm)) # with Color values
-                        #legendnames_sorted.append(nm) # without Color values
-                                        
-            l_info_sorted_to_ids = [(info[key]) for key in ids] #{key:info[key] for key in ids}            
-            #l_info_sorted_to_ids = list(info_sorted_to_ids.values())
-
-            l_size_sorted_to_ids = [(size[key]) for key in ids] #{key:size[key] for key in ids}
-            #l_size_sorted_to_ids = list(size_sorted_to_ids.values())
+        legendnames = [legend_names[col] for col, rows in groups if col in legend_names]
+        
+        for elem,(col, rows) in enumerate(groups):
+            ids = [posG.nodes[r] for r in rows]
             
-            l_col_sorted_to_ids = [(color[key]) for key in ids]
-
-            trace = pgo.Scatter3d(x=[i[0] for i in coords],
-                                  y=[i[1] for i in coords],
-                                  z=[i[2] for i in coords],
+            trace = pgo.Scatter3d(x=posG.coords[rows,0],
+                                  y=posG.coords[rows,1],
+                                  z=posG.coords[rows,2],
                                   mode = 'markers',
-                                  text = l_info_sorted_to_ids,
+                                  text = [info[key] for key in ids],
                                   hoverinfo = 'text',
-                                       marker = dict(
-                            color = l_col_sorted_to_ids, # col,
-                            size = l_size_sorted_to_ids,
-                            symbol = 'circle',
-                            line = dict(width = linewidth,
-                                    color = 'dimgrey'),
-                            opacity = opac,
-                        ),
-                    name = "Group: "+str(list(legendnames_sorted)[elem]) #legend_names.values())[elem])
-                    )
-            
+                                  marker = dict(
+                                      color = [color[key] for key in ids], # col,
+                                      size = [size[key] for key in ids],
+                                      symbol = 'circle',
+                                      line = dict(width = linewidth,
+                                                  color = 'dimgrey'),
+                                      opacity = opac,
+                                      ),
+                                  name = "Group: "+str((elem, legendnames[elem]))
+                                  )
             traces.append(trace)
             
         return traces 
     
     else:
-        for elem,(col, dct) in enumerate(d_col_pos_ordered.items()):
-            
-            ids = list(dct.keys())
-            coords = list(dct.values())
+        for elem,(col, rows) in enumerate(groups):
+            ids = [posG.nodes[r] for r in rows]
             
-            l_info_sorted_to_ids = [(info[key]) for key in ids] #{key:info[key] for key in ids}            
-            #l_info_sorted_to_ids = list(info_sorted_to_ids.values())
-
-            l_size_sorted_to_ids = [(size[key]) for key in ids] #{key:size[key] for key in ids}
-            #l_size_sorted_to_ids = list(size_sorted_to_ids.values())
-            
-            trace = pgo.Scatter3d(x=[i[0] for i in coords],
-                                  y=[i[1] for i in coords],
-                                  z=[i[2] for i in coords],
+            trace = pgo.Scatter3d(x=posG.coords[rows,0],
+                                  y=posG.coords[rows,1],
+                                  z=posG.coords[rows,2],
                                   mode = 'markers',
-                                  text = l_info_sorted_to_ids,
+                                  text = [info[key] for key in ids],
                                   hoverinfo = 'text',
-                                       marker = dict(
-                            color = col,
-                            size = l_size_sorted_to_ids,
-                            symbol = 'circle',
-                            line = dict(width = linewidth,
-                                    color = 'dimgrey'),
-                            opacity = opac,
-                        ),
-                    name = "Group: "+str(elem)
-                    )
+                                  marker = dict(
+                                      color = col,
+                                      size = [size[key] for key in ids],
+                                      symbol = 'circle',
+                                      line = dict(width = linewidth,
+                                                  color = 'dimgrey'),
+                                      opacity = opac,
+                                      ),
+                                  name = "Group: "+str(elem)
+                                  )
             traces.append(trace)
         return traces 
 
 
 
 
-def get_trace_edges_2D(G, posG, color = '#C7C7C7', opac = 0.1, linewidth = 0.25):
+def get_trace_edges_2D(G, posG, color = '#C7C7C7', opac = 0.1, linewidth = 0.25, backend = 'auto', webgl_threshold = WEBGL_THRESHOLD):
     '''
     Get trace of edges for plotting in 2D. 
     Input: 
     - G = Graph
-    - posG = dictionary with nodes as keys and coordinates as values.
+    - posG = Layout or dictionary with nodes as keys and coordinates as values.
     - color = string; hex color
     - opacity = transparency of edges e.g. 0.2
+    - backend = string; 'auto', 'svg' or 'webgl' (WebGL from webgl_threshold elements on), see resolve_backend
     
     Return a trace for plotly graph objects plot. 
     '''
     
     
-    edge_x = []
-    edge_y = []
-    for edge in G.edges():
-        x0, y0 = posG[edge[0]]
-        x1, y1 = posG[edge[1]]
-        edge_x.append(x0)
-        edge_x.append(x1)
-        edge_x.append(None)
-        edge_y.append(y0)
-        edge_y.append(y1)
-        edge_y.append(None)
+    edge_xy = get_edge_coords(posG, G.edges())
+    edge_x = edge_xy[:,0]
+    edge_y = edge_xy[:,1]
     
     
     if len(edge_x) < 500: 
@@ -785,8 +990,9 @@ def get_trace_edges_2D(G, posG, color = '#C7C7C7', opac = 0.1, linewidth = 0.25)
     elif len(edge_x) >= 2000:
         linewidth = 0.75
         opac = 0.1
-            
-    trace_edges = pgo.Scatter(
+    
+    scatter = _scatter_2D(G.number_of_edges(), backend, webgl_threshold)
+    trace_edges = scatter(
                         x = edge_x, 
                         y = edge_y, 
                         mode = 'lines', hoverinfo='none',
@@ -803,28 +1009,17 @@ def get_trace_edges_3D(G, posG, color = '#C7C7C7', opac = 0.1, linewidth=0.25):
     Get trace of edges for plotting in 3D. 
     Input: 
     - G = Graph
-    - posG = dictionary with nodes as keys and coordinates as values.
+    - posG = Layout or dictionary with nodes as keys and coordinates as values.
     - color = string; hex color
     - opac = transparency of edges e.g. 0.2
     
     Return a trace for plotly graph objects plot. 
     '''
     
-    edge_x = []
-    edge_y = []
-    edge_z = []
-    for edge in G.edges():
-            x0, y0, z0 = posG[edge[0]]
-            x1, y1, z1 = posG[edge[1]]
-            edge_x.append(x0)
-            edge_x.append(x1)
-            edge_x.append(None)
-            edge_y.append(y0)
-            edge_y.append(y1)
-            edge_y.append(None)
-            edge_z.append(z0)
-            edge_z.append(z1)
-            edge_z.append(None)
+    edge_xyz = get_edge_coords(posG, G.edges())
+    edge_x = edge_xyz[:,0]
+    edge_y = edge_xyz[:,1]
+    edge_z = edge_xyz[:,2]
             
     if len(edge_x) < 500: 
         linewidth = 1.0
@@ -850,24 +1045,16 @@ def get_trace_edges_3D(G, posG, color = '#C7C7C7', opac = 0.1, linewidth=0.25):
     return trace_edges
 
 
-def get_trace_edges_specific2D(d_edges_col, posG, linew = 0.75, opac=0.1):
+def get_trace_edges_specific2D(d_edges_col, posG, linew = 0.75, opac=0.1, backend = 'auto', webgl_threshold = WEBGL_THRESHOLD):
 
-    edge_x = []
-    edge_y = []
-    
-    for edge, col in d_edges_col.items():
-            x0, y0 = posG[edge[0]]
-            x1, y1 = posG[edge[1]]
-            edge_x.append(x0)
-            edge_x.append(x1)
-            edge_x.append(None)
-            edge_y.append(y0)
-            edge_y.append(y1)
-            edge_y.append(None)
+    edge_xy = get_edge_coords(posG, d_edges_col.keys())
+    edge_x = edge_xy[:,0]
+    edge_y = edge_xy[:,1]
             
     cols = list(d_edges_col.values())[0]
     
-    trace_edges = pgo.Scatter(
+    scatter = _scatter_2D(len(d_edges_col), backend, webgl_threshold)
+    trace_edges = scatter(
                         x = edge_x, 
                         y = edge_y, 
                         mode = 'lines', hoverinfo='none',
@@ -881,21 +1068,10 @@ def get_trace_edges_specific2D(d_edges_col, posG, linew = 0.75, opac=0.1):
 
 def get_trace_edges_specific3D(d_edges_col, posG, linew = 0.75, opac=0.1):
 
-    edge_x = []
-    edge_y = []
-    edge_z = []
-    for edge, col in d_edges_col.items():
-            x0, y0,z0 = posG[edge[0]]
-            x1, y1,z1 = posG[edge[1]]
-            edge_x.append(x0)
-            edge_x.append(x1)
-            edge_x.append(None)
-            edge_y.append(y0)
-            edge_y.append(y1)
-            edge_y.append(None)
-            edge_z.append(z0)
-            edge_z.append(z1)
-            edge_z.append(None)
+    edge_xyz = get_edge_coords(posG, d_edges_col.keys())
+    edge_x = edge_xyz[:,0]
+    edge_y = edge_xyz[:,1]
+    edge_z = edge_xyz[:,2]
             
     color = list(d_edges_col.values())[0]
     
@@ -912,33 +1088,26 @@ def get_trace_edges_specific3D(d_edges_col, posG, linew = 0.75, opac=0.1):
 
 
 
-def get_trace_edges_from_nodelist2D(G, l_nodes, posG, color, linew = 0.75, opac=0.1):
+def get_trace_edges_from_nodelist2D(G, l_nodes, posG, color, linew = 0.75, opac=0.1, backend = 'auto', webgl_threshold = WEBGL_THRESHOLD):
     '''
     Get trace of edges for plotting in 3D only for specific edges. 
     Input: 
     - G = Graph
-    - posG = dictionary with nodes as keys and coordinates as values.
+    - posG = Layout or dictionary with nodes as keys and coordinates as values.
     - color = string; specific color to highlight specific edges; hex color
+    - backend = string; 'auto', 'svg' or 'webgl' (WebGL from webgl_threshold elements on), see resolve_backend
     
     Return a trace of specific edges. 
     '''
     l_spec_edges = [(u,v) for u,v in G.edges(l_nodes) if u in l_nodes and v in l_nodes]
    
-    edge_x = []
-    edge_y = []
-    
-    for edge in l_spec_edges:
-            x0, y0 = posG[edge[0]]
-            x1, y1 = posG[edge[1]]
-            edge_x.append(x0)
-            edge_x.append(x1)
-            edge_x.append(None)
-            edge_y.append(y0)
-            edge_y.append(y1)
-            edge_y.append(None)
+    edge_xy = get_edge_coords(posG, l_spec_edges)
+    edge_x = edge_xy[:,0]
+    edge_y = edge_xy[:,1]
             
 
-    trace_edges = pgo.Scatter(
+    scatter = _scatter_2D(len(l_spec_edges), backend, webgl_threshold)
+    trace_edges = scatter(
                         x = edge_x, 
                         y = edge_y, 
                         mode = 'lines', hoverinfo='none',
@@ -954,28 +1123,17 @@ def get_trace_edges_from_nodelist3D(G, l_genes, posG, color, linew = 0.75, opac=
     Get trace of edges for plotting in 3D only for specific edges. 
     Input: 
     - G = Graph
-    - posG = dictionary with nodes as keys and coordinates as values.
+    - posG = Layout or dictionary with nodes as keys and coordinates as values.
     - color = string; specific color to highlight specific edges; hex color
     
     Return a trace of specific edges. 
     '''
     l_spec_edges = [(u,v)for u,v in G.edges(l_genes) if u in l_genes and v in l_genes]
     
-    edge_x = []
-    edge_y = []
-    edge_z = []
-    for edge in l_spec_edges:
-            x0, y0,z0 = posG[edge[0]]
-            x1, y1,z1 = posG[edge[1]]
-            edge_x.append(x0)
-            edge_x.append(x1)
-            edge_x.append(None)
-            edge_y.append(y0)
-            edge_y.append(y1)
-            edge_y.append(None)
-            edge_z.append(z0)
-            edge_z.append(z1)
-            edge_z.append(None)
+    edge_xyz = get_edge_coords(posG, l_spec_edges)
+    edge_x = edge_xyz[:,0]
+    edge_y = edge_xyz[:,1]
+    edge_z = edge_xyz[:,2]
             
     trace_edges = pgo.Scatter3d(
                         x = edge_x, 
@@ -1155,8 +1313,16 @@ def plot_2Dfigure(G, posG,
                   fname ='testplot',
                   scheme = 'light', 
                   with_edges = True,
-                  plot_title = None
+                  plot_title = None,
+                  backend = 'auto',
+                  webgl_threshold = WEBGL_THRESHOLD
                  ):
+    '''
+    Create a 2D figure of a network layout using plotly.
+    Optional: 
+    - backend = string; 'auto', 'svg' or 'webgl'; 'auto' renders nodes and edges with WebGL (pgo.Scattergl) 
+      from webgl_threshold elements (nodes + edges) on, see resolve_backend
+    '''
     
     if d_features == None:
         d_features = dict(zip(list(G.nodes()),list(G.nodes())))
@@ -1176,12 +1342,16 @@ def plot_2Dfigure(G, posG,
     else:
         pass
     
+    # one backend for all traces of the figure
+    n_elements = len(posG) + (G.number_of_edges() if with_edges == True else 0)
+    backend = resolve_backend(n_elements, backend, webgl_threshold)
+    
     if with_edges == True:
-        umap_nodes = get_trace_nodes_2D_legend(posG, d_features, d_colors, d_size, d_legend)
-        umap_edges = get_trace_edges_2D(G, posG)
+        umap_nodes = get_trace_nodes_2D_legend(posG, d_features, d_colors, d_size, d_legend, backend=backend)
+        umap_edges = get_trace_edges_2D(G, posG, backend=backend)
         data = [umap_edges, *umap_nodes]
     else: 
-        umap_nodes = get_trace_nodes_2D_legend(posG, d_features, d_colors, d_size, d_legend)
+        umap_nodes = get_trace_nodes_2D_legend(posG, d_features, d_colors, d_size, d_legend, backend=backend)
         data = [*umap_nodes]
         
     fig = pgo.Figure()
@@ -8,6 +8,7 @@
 ########################################################################################
 
 from cartoGRAPHs.func_visual_properties import *
+from cartoGRAPHs.func_layout import *
 import pandas as pd
 import json 
 
@@ -21,6 +22,7 @@ def exportVR_CSV(filename, G, posG, d_node_colors, d_annotations, linkcolor,clus
     Export tables for the CSV file uploader of the VRNetzer (beta release, april2023)
         
     G: nx.Graph object
+    posG: Layout or dict with keys=nodeID and values=coordinates (2D or 3D)
     d_node_colors: dict with keys=nodeID and values=color for each node in hex or rgba
     d_annotations: dict with keys=nodeID and values=annotations for each node as string, divided with ";" 
     linkcolor: hex value or dict with keys=link and values=color for each link in Graph 
@@ -34,19 +36,20 @@ def exportVR_CSV(filename, G, posG, d_node_colors, d_annotations, linkcolor,clus
     filename = filename.replace(" ", "")
     
     # NODE POSITIONS 
+    posG = as_layout(posG)
     df_nodepos = pd.DataFrame()
     
-    if len(list(posG.values())[0]) == 2:
-        df_nodepos['x']=[i[0] for i in posG.values()]
-        df_nodepos['y']=[i[1] for i in posG.values()]
-        df_nodepos['z']=[0 for i in posG.values()]
+    if posG.dim == 2:
+        df_nodepos['x']=posG.coords[:,0]
+        df_nodepos['y']=posG.coords[:,1]
+        df_nodepos['z']=0
         df_nodepos.to_csv(filename+'_nodepositions.csv', header=None, index=0)
         #print("Exported File: ", filename+'_nodepositions.csv')
 
-    elif len(list(posG.values())[0]) == 3: 
-        df_nodepos['x']=[i[0] for i in posG.values()]
-        df_nodepos['y']=[i[1] for i in posG.values()]
-        df_nodepos['z']=[i[2] for i in posG.values()]
+    elif posG.dim == 3: 
+        df_nodepos['x']=posG.coords[:,0]
+        df_nodepos['y']=posG.coords[:,1]
+        df_nodepos['z']=posG.coords[:,2]
         df_nodepos.to_csv(filename+'_nodepositions.csv', header=None, index=0)
         #print("Exported File: ", filename+'_nodepositions.csv')
 
@@ -126,10 +129,9 @@ def exportVR_JSON(filename, G,posG,d_node_colors, d_annotations, linkcolor, dict
     # modify filename to not contain any spaces :
     filename = filename.replace(" ", "")
     
-    if len(list(posG.values())[0]) == 2:
-        new_posG = {}
-        for k,v in posG.items():
-            new_posG[k] = (v[0],v[1],0)
+    posG = as_layout(posG)
+    if posG.dim == 2:
+        new_posG = Layout(posG.nodes, np.column_stack((posG.coords, np.zeros(len(posG)))))
     else:
         new_posG = posG
         
@@ -0,0 +1,434 @@
+########################################################################################
+#
+# This python file is part of the Project "cartoGRAPHs"
+# and contains a M U L T I L E V E L  F O R C E - D I R E C T E D  L A Y O U T
+#
+########################################################################################
+
+import numpy as np
+import networkx as nx
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from cartoGRAPHs._lazy import lazy_import
+
+# numba is only imported (and the kernels compiled) on first use
+numba = lazy_import('numba')
+
+########################################################################################
+
+# spring-electrical model (Hu 2005) : repulsion C*K^2/d, attraction d^2/K
+FORCE_REPULSION = 0.2
+FORCE_COOLING = 0.9
+FORCE_THETA = 1.0           # Barnes-Hut opening criterion
+FORCE_LEAF_SIZE = 8         # nodes per tree leaf
+FORCE_MAX_DEPTH = 48
+FORCE_MIN_NODES = 50        # stop coarsening below this number of nodes
+FORCE_MIN_COARSENING = 0.75 # stop coarsening if a level keeps more than this fraction of nodes
+FORCE_PACK_GAP = 1.0        # space between packed components, in units of the edge length K
+
+_kernels = {}
+
+
+def _jit(func):
+    '''
+    Compile func with numba on first use.
+    '''
+    if func not in _kernels:
+        _kernels[func] = numba.njit(cache=True, fastmath=True)(func)
+    return _kernels[func]
+
+
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+# K E R N E L S
+
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+def _build_tree(pos, mass, leaf_size, max_depth, cap):
+    '''
+    Barnes-Hut tree (quadtree in 2D, octree in 3D) over the positions, stored as arrays.
+    Cells hold the nodes perm[start:end]; children of a cell are the cells child .. child+nchild-1.
+    Return number of cells (-1 if more than cap cells are needed) and the cell arrays.
+    '''
+    n, d = pos.shape
+    nchild_max = 2 ** d
+
+    perm = np.arange(n)
+    tmp = np.empty(n, dtype=np.int64)
+    octant = np.empty(n, dtype=np.int64)
+    counts = np.empty(nchild_max, dtype=np.int64)
+
+    start = np.empty(cap, dtype=np.int64)
+    end = np.empty(cap, dtype=np.int64)
+    child = np.zeros(cap, dtype=np.int64)
+    nchild = np.zeros(cap, dtype=np.int64)
+    depth = np.zeros(cap, dtype=np.int64)
+    cmass = np.zeros(cap)
+    center = np.zeros((cap, d))
+    lo = np.empty((cap, d))
+    size = np.empty(cap)
+
+    size[0] = 1e-9
+    for k in range(d):
+        lo[0, k] = pos[:, k].min()
+        size[0] = max(size[0], pos[:, k].max() - lo[0, k] + 1e-9)
+    start[0] = 0
+    end[0] = n
+
+    ncell = 1
+    c = 0
+    while c < ncell:
+        s = start[c]
+        e = end[c]
+        for jj in range(s, e):
+            j = perm[jj]
+            cmass[c] += mass[j]
+            for k in range(d):
+                center[c, k] += mass[j] * pos[j, k]
+        for k in range(d):
+            center[c, k] /= cmass[c]
+
+        if e - s > leaf_size and depth[c] < max_depth:
+            half = size[c] / 2
+
+            # counting sort of the cell's nodes by child cell
+            counts[:] = 0
+            for jj in range(s, e):
+                j = perm[jj]
+                o = 0
+                for k in range(d):
+                    o = 2 * o + (1 if pos[j, k] >= lo[c, k] + half else 0)
+                octant[jj] = o
+                counts[o] += 1
+            offset = 0
+            for o in range(nchild_max):
+                offset += counts[o]
+                counts[o] = offset - counts[o]
+            for jj in range(s, e):
+                o = octant[jj]
+                tmp[s + counts[o]] = perm[jj]
+                counts[o] += 1
+            perm[s:e] = tmp[s:e]
+
+            child[c] = ncell
+            o_start = 0
+            for o in range(nchild_max):
+                if counts[o] > o_start:
+                    if ncell >= cap:
+                        return -1, perm, start, end, child, nchild, cmass, center, size
+                    start[ncell] = s + o_start
+                    end[ncell] = s + counts[o]
+                    depth[ncell] = depth[c] + 1
+                    size[ncell] = half
+                    for k in range(d):
+                        lo[ncell, k] = lo[c, k] + half * ((o >> (d - 1 - k)) & 1)
+                    ncell += 1
+                o_start = counts[o]
+            nchild[c] = ncell - child[c]
+        c += 1
+
+    return ncell, perm, start, end, child, nchild, cmass, center, size
+
+
+def _forces(pos, mass, indptr, indices, weights, K, C, theta, perm, start, end, child, nchild, cmass, center, size, out):
+    '''
+    Force on each node. Repulsion from the Barnes-Hut tree : cells which look small from a node
+    (size/distance < theta) act through their center of mass, leaves exactly.
+    Attraction along the edges of the CSR graph (indptr, indices, weights).
+    '''
+    n, d = pos.shape
+    stack = np.empty(64 * 2 ** d, dtype=np.int64)
+    f = np.empty(d)
+    delta = np.empty(d)
+
+    for i in range(n):
+        f[:] = 0.0
+
+        # repulsion
+        stack[0] = 0
+        top = 1
+        while top > 0:
+            top -= 1
+            c = stack[top]
+            if nchild[c] == 0:
+                for jj in range(start[c], end[c]):
+                    j = perm[jj]
+                    if j == i:
+                        continue
+                    dist2 = 1e-9
+                    for k in range(d):
+                        delta[k] = pos[i, k] - pos[j, k]
+                        dist2 += delta[k] * delta[k]
+                    s = C * K * K * mass[i] * mass[j] / dist2
+                    for k in range(d):
+                        f[k] += s * delta[k]
+            else:
+                dist2 = 1e-9
+                for k in range(d):
+                    delta[k] = pos[i, k] - center[c, k]
+                    dist2 += delta[k] * delta[k]
+                if size[c] * size[c] < theta * theta * dist2:
+                    s = C * K * K * mass[i] * cmass[c] / dist2
+                    for k in range(d):
+                        f[k] += s * delta[k]
+                else:
+                    for cc in range(child[c], child[c] + nchild[c]):
+                        stack[top] = cc
+                        top += 1
+
+        # attraction
+        for jj in range(indptr[i], indptr[i + 1]):
+            j = indices[jj]
+            if j == i:
+                continue
+            dist2 = 0.0
+            for k in range(d):
+                delta[k] = pos[j, k] - pos[i, k]
+                dist2 += delta[k] * delta[k]
+            s = weights[jj] * np.sqrt(dist2) / K
+            for k in range(d):
+                f[k] += s * delta[k]
+
+        for k in range(d):
+            out[i, k] = f[k]
+
+
+def _match(indptr, indices, weights, mass, order):
+    '''
+    Heavy edge matching : each node (in the given order) is merged with its unmatched neighbor
+    of largest weight/(mass_i*mass_j), which keeps coarse nodes of similar size.
+    Return parent (coarse node of each node) and the number of coarse nodes.
+    '''
+    n = len(order)
+    parent = -np.ones(n, dtype=np.int64)
+    ncoarse = 0
+    for i in order:
+        if parent[i] >= 0:
+            continue
+        best = -1
+        best_w = 0.0
+        for jj in range(indptr[i], indptr[i + 1]):
+            j = indices[jj]
+            if j != i and parent[j] < 0:
+                w = weights[jj] / (mass[i] * mass[j])
+                if w > best_w:
+                    best = j
+                    best_w = w
+        parent[i] = ncoarse
+        if best >= 0:
+            parent[best] = ncoarse
+        ncoarse += 1
+    return parent, ncoarse
+
+
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+# M U L T I L E V E L  L A Y O U T
+
+# -------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------
+
+def coarsen_graph(A, mass=None, seed=None):
+    '''
+    Coarsen a graph by heavy edge matching until it has less than FORCE_MIN_NODES nodes
+    or stops shrinking.
+    Input:
+    - A = symmetric sparse adjacency matrix
+    - mass = array; number of original nodes in each node (default: 1)
+    - seed = int; random seed for the matching order
+
+    Return list of levels (A, mass, parent) from fine to coarse; parent maps the nodes of a level
+    to the nodes of the next coarser level (None for the coarsest).
+    '''
+    rng = np.random.default_rng(seed)
+    A = sp.csr_matrix(A, dtype=float)
+    A.setdiag(0)
+    A.eliminate_zeros()
+    mass = np.ones(A.shape[0]) if mass is None else np.asarray(mass, dtype=float)
+
+    levels = []
+    while True:
+        n = A.shape[0]
+        parent = None
+        if n > FORCE_MIN_NODES:
+            parent, ncoarse = _jit(_match)(A.indptr, A.indices, A.data, mass, rng.permutation(n))
+            if ncoarse > FORCE_MIN_COARSENING * n:
+                parent = None
+        levels.append((A, mass, parent))
+        if parent is None:
+            return levels
+
+        P = sp.csr_matrix((np.ones(n), (np.arange(n), parent)), shape=(n, ncoarse))
+        A = (P.T @ A @ P).tocsr()
+        A.setdiag(0)
+        A.eliminate_zeros()
+        mass = P.T @ mass
+
+
+def refine_layout(pos, A, mass, iterations=50, step=None, K=1.0, tol=1e-3):
+    '''
+    Force-directed refinement of positions with adaptive step length (Hu 2005).
+    Input:
+    - pos = numpy array (nodes x dim), changed in place
+    - A = sparse adjacency matrix (CSR), mass = array of node masses
+    - iterations = int; maximal number of iterations
+    - step = float; initial step length (default: K)
+    - tol = float; stop if the step length drops below tol*K
+
+    Return numpy array of positions.
+    '''
+    n, d = pos.shape
+    if n < 2:
+        return pos
+
+    build_tree = _jit(_build_tree)
+    forces = _jit(_forces)
+    step = K if step is None else step
+    cap = 2 * n + 16
+
+    out = np.empty_like(pos)
+    energy = np.inf
+    progress = 0
+    for it in range(iterations):
+        tree = build_tree(pos, mass, FORCE_LEAF_SIZE, FORCE_MAX_DEPTH, cap)
+        while tree[0] < 0:
+            cap *= 2
+            tree = build_tree(pos, mass, FORCE_LEAF_SIZE, FORCE_MAX_DEPTH, cap)
+        forces(pos, mass, A.indptr, A.indices, A.data, K, FORCE_REPULSION, FORCE_THETA, *tree[1:], out)
+        norm = np.sqrt((out ** 2).sum(axis=1))
+        pos += step * out / np.maximum(norm, 1e-12)[:, np.newaxis]
+
+        energy_new = (norm ** 2).sum()
+        if energy_new < energy:
+            progress += 1
+            if progress >= 5:
+                progress = 0
+                step /= FORCE_COOLING
+        else:
+            progress = 0
+            step *= FORCE_COOLING
+        energy = energy_new
+
+        if step < tol * K:
+            break
+
+    return pos
+
+
+def _force_layout_connected(A, dim, iterations, rng, seed, tol):
+    '''
+    Multilevel layout of one connected graph, see force_layout.
+    '''
+    levels = coarsen_graph(A, seed=seed)
+
+    A_c, mass_c, _ = levels[-1]
+    n_c = A_c.shape[0]
+    extent = max(n_c, 1) ** (1.0 / dim)
+    pos = rng.uniform(0, extent, size=(n_c, dim))
+    pos = refine_layout(pos, A_c, mass_c, 4 * iterations, step=0.1 * extent, tol=tol)
+
+    for A_f, mass_f, parent in reversed(levels[:-1]):
+        pos = pos[parent] + rng.uniform(-0.1, 0.1, size=(A_f.shape[0], dim))
+        pos = refine_layout(pos, A_f, mass_f, iterations, tol=tol)
+
+    return pos
+
+
+def pack_components(boxes, gap=FORCE_PACK_GAP):
+    '''
+    Shelf packing of axis-aligned boxes : boxes are placed largest first in rows of
+    roughly equal length, rows are stacked along the second axis (and in 3D into layers
+    along the third axis) so that the packing is about as long as it is wide (and deep).
+    Input:
+    - boxes = numpy array (boxes x dim); size of each box
+    - gap = float; space between boxes
+
+    Return numpy array (boxes x dim) with the lower corner of each box.
+    '''
+    n, d = boxes.shape
+    sizes = boxes + gap
+    side = max(sizes.max(), np.prod(sizes, axis=1).sum() ** (1.0 / d))
+
+    corners = np.zeros((n, d))
+    cursor = np.zeros(d)
+    row = 0.0
+    layer = 0.0
+    for i in np.argsort(-sizes.max(axis=1), kind='stable'):
+        if cursor[0] > 0 and cursor[0] + sizes[i, 0] > side:
+            cursor[0] = 0.0
+            cursor[1] += row
+            row = 0.0
+            if d > 2 and cursor[1] + sizes[i, 1] > side:
+                cursor[1] = 0.0
+                cursor[2] += layer
+                layer = 0.0
+        corners[i] = cursor
+        cursor[0] += sizes[i, 0]
+        row = max(row, sizes[i, 1])
+        if d > 2:
+            layer = max(layer, sizes[i, 2])
+
+    return corners
+
+
+def force_layout(A, dim=2, iterations=50, seed=None, tol=1e-3):
+    '''
+    Multilevel force-directed layout : the graph is coarsened by heavy edge matching,
+    the coarsest graph laid out from random positions and each finer level refined
+    starting from the positions of its coarse nodes. Connected components (and isolated
+    nodes) are laid out separately and packed next to each other, see pack_components.
+    Input:
+    - A = symmetric (sparse) adjacency matrix, edge weights as values
+    - dim = int; 2 or 3 dimensions
+    - iterations = int; iterations per level (the coarsest level gets 4x)
+    - seed = int; random seed
+
+    Return numpy array of positions (rows of A x dim), not normalized.
+    '''
+    rng = np.random.default_rng(seed)
+    A = sp.csr_matrix(A, dtype=float)
+    ncomp, labels = connected_components(A, directed=False)
+    if ncomp == 1:
+        return _force_layout_connected(A, dim, iterations, rng, seed, tol)
+
+    pos = np.zeros((A.shape[0], dim))
+    members = np.split(np.argsort(labels, kind='stable'), np.cumsum(np.bincount(labels))[:-1])
+    boxes = np.zeros((ncomp, dim))
+    for c, idx in enumerate(members):
+        if len(idx) > 1:
+            pos_c = _force_layout_connected(A[idx][:, idx], dim, iterations, rng, seed, tol)
+            pos_c -= pos_c.min(axis=0)
+            pos[idx] = pos_c
+            boxes[c] = pos_c.max(axis=0)
+
+    corners = pack_components(boxes)
+    pos += corners[labels]
+
+    return pos
+
+
+def forcelayout_coords(G, dim=2, iterations=50, weight=None, seed=None):
+    '''
+    Multilevel force-directed layout of a networkx Graph, see force_layout.
+    Input:
+    - G = Graph
+    - dim = int; 2 or 3 dimensions
+    - iterations = int; iterations per level
+    - weight = string; edge attribute used as weight (default: unweighted)
+    - seed = int; random seed
+
+    Return numpy array of positions (rows in the order of G.nodes()), min-max normalized to (0,1).
+    '''
+    A = nx.to_scipy_sparse_array(G, nodelist=list(G.nodes()), weight=weight, format='csr')
+    A = sp.csr_matrix(A + A.T, dtype=float) if G.is_directed() else sp.csr_matrix(A, dtype=float)
+
+    pos = force_layout(A, dim, iterations, seed)
+
+    mins = pos.min(axis=0)
+    ranges = pos.max(axis=0) - mins
+    ranges[ranges == 0] = 1
+    return (pos - mins) / ranges
@@ -0,0 +1,175 @@
+########################################################################################
+#
+# This python file is part of the Project "cartoGRAPHs"
+# and contains the  L A Y O U T  object for node positions
+# 
+########################################################################################
+
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+
+########################################################################################
+
+
+class Layout(MutableMapping):
+    '''
+    Node positions of a layout, stored as one contiguous (n, dim) float array and a node index. 
+    Behaves like the position dictionaries (posG) used throughout cartoGRAPHs, i.e. posG[node] returns 
+    a tuple of coordinates and keys(), values(), items() follow the node order.
+    
+    Attributes:
+    - nodes = list of node IDs 
+    - coords = numpy array (n, dim) with coordinates in the order of nodes
+    - index = dictionary with node IDs as keys and row in coords as values
+    - model = optional fitted embedding the coordinates were generated with (see place_nodes), default None;
+      not pickled, so cached or stored layouts do not carry the embedded matrix
+    '''
+    
+    def __init__(self, nodes, coords):
+        self.nodes = list(nodes)
+        self.coords = np.ascontiguousarray(coords, dtype=float)
+        if self.coords.size == 0:
+            self.coords = self.coords.reshape(len(self.nodes), -1 if len(self.nodes) else 0)
+        if self.coords.ndim != 2 or self.coords.shape[0] != len(self.nodes):
+            raise ValueError('Layout needs one row of coordinates per node.')
+        self.index = dict(zip(self.nodes, range(len(self.nodes))))
+        self.model = None
+        
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['model'] = None
+        return state
+        
+    @property
+    def dim(self):
+        return self.coords.shape[1]
+        
+    def __getitem__(self, node):
+        return tuple(self.coords[self.index[node]])
+    
+    def __setitem__(self, node, value):
+        if node in self.index:
+            self.coords[self.index[node]] = value
+        else:
+            self.index[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.coords = np.vstack((self.coords, np.asarray(value, dtype=float).reshape(1, -1)))
+    
+    def __delitem__(self, node):
+        row = self.index.pop(node)
+        del self.nodes[row]
+        self.coords = np.delete(self.coords, row, axis=0)
+        self.index = dict(zip(self.nodes, range(len(self.nodes))))
+    
+    def __contains__(self, node):
+        return node in self.index
+        
+    def __iter__(self):
+        return iter(self.nodes)
+    
+    def __len__(self):
+        return len(self.nodes)
+    
+    def __repr__(self):
+        return 'Layout(%d nodes, dim=%d)' % (len(self.nodes), self.dim)
+    
+    def rows(self, nodes):
+        '''
+        Return numpy array with the rows in coords of the given nodes.
+        '''
+        return np.fromiter((self.index[n] for n in nodes), dtype=np.intp, count=len(nodes))
+    
+    def copy(self):
+        layout = Layout(self.nodes, self.coords.copy())
+        layout.model = self.model
+        return layout
+    
+    def to_dict(self):
+        '''
+        Return dictionary with nodes as keys and coordinates (tuples) as values.
+        '''
+        return dict(zip(self.nodes, map(tuple, self.coords.tolist())))
+    
+    def to_frame(self):
+        '''
+        Return pd.DataFrame with nodes as index and one column per dimension.
+        '''
+        return pd.DataFrame(self.coords, index=self.nodes)
+    
+
+def as_layout(posG, nodes=None):
+    '''
+    Convert node positions to a Layout. 
+    Input: 
+    - posG = Layout or dictionary with nodes as keys and coordinates as values
+    - nodes = optional list of nodes; order (and subset) of the returned Layout
+    
+    Return Layout (posG itself if no conversion is needed).
+    '''
+    if isinstance(posG, Layout):
+        if nodes is None or nodes == posG.nodes:
+            return posG
+        layout = Layout(nodes, posG.coords[posG.rows(nodes)])
+        layout.model = posG.model
+        return layout
+    
+    if nodes is None:
+        nodes = list(posG.keys())
+    
+    return Layout(nodes, [posG[n] for n in nodes])
+
+
+
+# -------------------------------------------------------------------------------------
+# E D G E  G E O M E T R Y 
+# -------------------------------------------------------------------------------------
+
+def edge_index(posG, edges):
+    '''
+    Convert edges to rows of the coordinate array of a layout.
+    Input: 
+    - posG = Layout or dictionary with nodes as keys and coordinates as values
+    - edges = iterable of edges (node ID pairs), e.g. G.edges()
+    
+    Return numpy array (m, 2) with row indices of both end nodes.
+    '''
+    posG = as_layout(posG)
+    edges = list(edges)
+    
+    idx = np.fromiter((posG.index[n] for e in edges for n in e[:2]), dtype=np.intp, count=2*len(edges))
+    
+    return idx.reshape(-1, 2)
+
+
+def edge_coords(coords, edge_idx):
+    '''
+    Build line coordinates of edges for plotting, with NaN separators between edges.
+    Input: 
+    - coords = numpy array (n, dim) with node coordinates 
+    - edge_idx = numpy array (m, 2) with row indices of both end nodes of each edge
+    
+    Return numpy array (3*m, dim); start node, end node and NaN for each edge. 
+    '''
+    edge_idx = np.asarray(edge_idx, dtype=np.intp).reshape(-1, 2)
+    
+    segments = np.full((len(edge_idx), 3, coords.shape[1]), np.nan)
+    segments[:, 0] = coords[edge_idx[:, 0]]
+    segments[:, 1] = coords[edge_idx[:, 1]]
+    
+    return segments.reshape(-1, coords.shape[1])
+
+
+def get_edge_coords(posG, edges):
+    '''
+    Line coordinates of edges for plotting (see edge_coords).
+    Input: 
+    - posG = Layout or dictionary with nodes as keys and coordinates as values
+    - edges = iterable of edges (node ID pairs), e.g. G.edges()
+    
+    Return numpy array (3*m, dim); start node, end node and NaN for each edge. 
+    '''
+    posG = as_layout(posG)
+    
+    return edge_coords(posG.coords, edge_index(posG, edges))
@@ -6,10 +6,17 @@
 # 
 ########################################################################################
 
+import os
+import json
 import networkx as nx
 import pickle 
+import numpy as np
 import pandas as pd
-from scipy.spatial import distance
+
+from cartoGRAPHs._lazy import lazy_import
+
+# heavy dependencies, imported on first use 
+distance = lazy_import('scipy.spatial.distance')
 
 ########################################################################################
 
@@ -83,6 +90,14 @@ def load_centralities(G,organism):
         Return dictionary with genes as keys and four centrality metrics as values.
         '''
         df_centralities = pd.read_csv('input/Features_centralities_Dataframe_'+organism+'.csv', index_col=0)
+        
+        # align rows by node ID (the csv index is read as int or str, G may use either)
+        d_index = {str(i): i for i in df_centralities.index}
+        if all(str(n) in d_index for n in G.nodes()):
+            df_centralities = df_centralities.loc[[d_index[str(n)] for n in G.nodes()]]
+        else:
+            print('Not all nodes of G found in the centrality table, rows are assigned by position.')
+        
         d_deghubs = dict(zip(G.nodes(), df_centralities['degs']))
         d_clos = dict(zip(G.nodes(), df_centralities['clos']))
         d_betw = dict(zip(G.nodes(), df_centralities['betw']))
@@ -243,38 +258,117 @@ def load_essentiality(G, organism):
 
             
             
-def load_datamatrix(G,organism,netlayout):
+def load_datamatrix(G,organism,netlayout, mmap=False):
     '''
     Load precalculated Matrix with N genes and M features.
     Input: 
     - path = directory of file location
     - organism = string; choose from 'human' or 'yeast'
     - netlayout = string; choose a network layout e.g. 'local', 'global', 'importance', 'funct-bio', 'funct-cel', 'funct-mol', funct-dis'
+    - mmap = bool; if True the matrix is opened from a matrix store with np.memmap (see save_matrixstore). 
+      A missing store is converted once from the pickle file.
 
     Return Matrix based on choice.
     '''
     path = 'input/'
     
     if netlayout == 'local':
-        return pd.read_pickle(path+'Adjacency_Dataframe_'+organism+'.pickle')
+        fname = path+'Adjacency_Dataframe_'+organism
     
     elif netlayout == 'global':
-        return pd.read_pickle(path+'RWR_Dataframe_'+organism+'.pickle')
+        fname = path+'RWR_Dataframe_'+organism
     
     elif netlayout == 'importance':
-        return pd.read_pickle(path+'Matrix_centrality_Dataframe_'+organism+'_cosine.pickle')
+        fname = path+'Matrix_centrality_Dataframe_'+organism+'_cosine'
     
     elif netlayout == 'funct-bio' and organism == 'human':
-        return pd.read_pickle('input/Matrix_goBP_Dataframe_Human_cosine.pickle') #pd.read_pickle('input/Features_BioProc_Dataframe_human.pickle')
+        fname = path+'Matrix_goBP_Dataframe_Human_cosine' #pd.read_pickle('input/Features_BioProc_Dataframe_human.pickle')
     
     elif netlayout == 'funct-mol' and organism == 'human':
-        return pd.read_pickle('input/Matrix_goMF_Dataframe_Human_cosine.pickle') #pd.read_pickle('input/Features_MolFunc_Dataframe_human.pickle')
+        fname = path+'Matrix_goMF_Dataframe_Human_cosine' #pd.read_pickle('input/Features_MolFunc_Dataframe_human.pickle')
     
     elif netlayout == 'funct-cel' and organism == 'human':
-        return pd.read_pickle('input/Matrix_goCC_Dataframe_Human_cosine.pickle') #pd.read_pickle('input/Features_GO_CellComp_Dataframe_human.pickle')
+        fname = path+'Matrix_goCC_Dataframe_Human_cosine' #pd.read_pickle('input/Features_GO_CellComp_Dataframe_human.pickle')
     
     elif netlayout == 'funct-dis' and organism == 'human':
-        return pd.read_pickle('input/Matrix_Disease_Dataframe_Human_cosine.pickle') #pd.read_pickle('input/Features_Disease_Dataframe_human.pickle')
+        fname = path+'Matrix_Disease_Dataframe_Human_cosine' #pd.read_pickle('input/Features_Disease_Dataframe_human.pickle')
     
     else: 
         print('Please type one of the following: "local", "global", "importance", "funct-dis/bio/cel/mol"')
+        return None
+    
+    if mmap:
+        if not os.path.exists(fname+'.npy'):
+            convert_pickle_to_matrixstore(fname+'.pickle', fname)
+        return load_matrixstore(fname, mmap=True)
+    
+    return pd.read_pickle(fname+'.pickle')
+
+
+
+# -------------------------------------------------------------------------------------
+# M A T R I X  S T O R E 
+# -------------------------------------------------------------------------------------
+
+# node IDs and feature names which are stored unchanged in the JSON index of a matrix store
+_JSON_LABEL_TYPES = (str, int, float, bool)
+
+
+def save_matrixstore(DM, path):
+    '''
+    Save a feature matrix as matrix store, i.e. a raw float32 .npy file and a small index file (.index.json) 
+    with node IDs (rows) and feature names (columns). 
+    Input: 
+    - DM = pd.DataFrame with node IDs as index and features as columns
+    - path = string; file path without file extension 
+    
+    Return list of files written. Raises ValueError for node IDs or feature names that JSON does not 
+    store as they are (e.g. tuples), since the loaded index would no longer match G.nodes.
+    '''
+    d_index = {'index': DM.index.tolist(), 'columns': DM.columns.tolist()}
+    for name, labels in d_index.items():
+        invalid = [i for i in labels if type(i) not in _JSON_LABEL_TYPES]
+        if invalid:
+            raise ValueError('Matrix store %s must be strings or numbers, found %r.' % (name, invalid[0]))
+    
+    np.save(path+'.npy', np.ascontiguousarray(DM.values, dtype=np.float32))
+    
+    with open(path+'.index.json', 'w') as f:
+        json.dump(d_index, f)
+        
+    return [path+'.npy', path+'.index.json']
+
+
+def load_matrixstore(path, mmap=True):
+    '''
+    Load a feature matrix saved with save_matrixstore. 
+    Input: 
+    - path = string; file path without file extension 
+    - mmap = bool; if True the values are memory-mapped read-only, so that processes share the pages 
+      and only the rows used are read from disk
+    
+    Return pd.DataFrame with node IDs as index and features as columns.
+    '''
+    values = np.load(path+'.npy', mmap_mode='r' if mmap else None)
+    
+    with open(path+'.index.json') as f:
+        d_index = json.load(f)
+        
+    return pd.DataFrame(values, index=d_index['index'], columns=d_index['columns'], copy=False)
+
+
+def convert_pickle_to_matrixstore(pickle_path, path=None):
+    '''
+    Convert a pickled feature matrix (pd.DataFrame, e.g. 'input/RWR_Dataframe_human.pickle') into a matrix store.
+    Input: 
+    - pickle_path = string; path of the pickle file
+    - path = string; file path of the matrix store without file extension, default pickle_path without ".pickle"
+    
+    Return list of files written.
+    '''
+    if path is None:
+        path = os.path.splitext(pickle_path)[0]
+        
+    DM = pd.read_pickle(pickle_path)
+    
+    return save_matrixstore(DM, path)
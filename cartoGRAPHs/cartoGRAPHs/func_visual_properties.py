@@ -7,18 +7,20 @@
 ########################################################################################
 
 import colorsys
-
-import seaborn as sns
-import matplotlib as mpl
+import functools
 
 import numpy as np 
 import networkx as nx
 
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.cluster import DBSCAN
-from sklearn.cluster import SpectralClustering
-from sklearn.metrics import pairwise_distances
+
+from cartoGRAPHs._lazy import lazy_import
+from cartoGRAPHs.func_layout import *
+
+# heavy dependencies, imported on first use 
+sns = lazy_import('seaborn')
+mpl = lazy_import('matplotlib')
+cluster = lazy_import('sklearn.cluster')
 
 ########################################################################################
 
@@ -74,6 +76,151 @@ def darken_color(r, g, b, factor=0.9):
     return adjust_color_lightness(r, g, b, 1 - factor)
 
 
+# -------------------------------------------------------------------------------------
+# P A L E T T E S
+# -------------------------------------------------------------------------------------
+
+# hex code of every 8 bit channel value, to convert RGB arrays to hex colors in one step
+_HEX_CHANNEL = np.array(['%02x' % i for i in range(256)])
+
+
+def factorize_values(values):
+    '''
+    Map values to integer codes of their sorted distinct values.
+    Input: 
+    - values = list or array of values, e.g. cluster IDs or degrees
+    
+    Return numpy array of codes (one per value) and number of distinct values.
+    '''
+    codes, uniques = pd.factorize(pd.Series(list(values), dtype=object), sort=True, use_na_sentinel=False)
+    return codes, len(uniques)
+
+
+@functools.lru_cache(maxsize=128)
+def _palette_arrays(palette, n_colors):
+    
+    pal = sns.color_palette(list(palette) if isinstance(palette, tuple) else palette, n_colors)
+    hexes = np.array(pal.as_hex(), dtype=object)
+    rgba = np.ones((len(pal), 4))
+    rgba[:, :3] = np.asarray(pal, dtype=float).reshape(-1, 3)
+    hexes.flags.writeable = False
+    rgba.flags.writeable = False
+    
+    return hexes, rgba
+
+
+def get_palette(palette, n_colors):
+    '''
+    Colors of a seaborn palette, cached by palette and number of colors.
+    Input: 
+    - palette = string; sns color palette e.g. 'YlOrRd', or list of colors
+    - n_colors = int; number of colors
+    
+    Return numpy arrays of hex colors (n_colors) and RGBA colors (n_colors x 4), read-only.
+    '''
+    if isinstance(palette, (list, tuple, np.ndarray)):
+        palette = tuple(tuple(c) if np.iterable(c) and not isinstance(c, str) else c for c in palette)
+    try:
+        hash(palette)
+    except TypeError:
+        return _palette_arrays.__wrapped__(palette, n_colors)
+    return _palette_arrays(palette, n_colors)
+
+
+def rgba_to_hex(rgba):
+    '''
+    Convert an array of RGB(A) colors with values in (0,1) to hex colors.
+    Return numpy array of hex colors.
+    '''
+    rgb = np.clip(np.round(np.asarray(rgba, dtype=float)[:, :3] * 255), 0, 255).astype(int)
+    hexes = np.char.add(np.char.add(np.char.add('#', _HEX_CHANNEL[rgb[:, 0]]), _HEX_CHANNEL[rgb[:, 1]]), _HEX_CHANNEL[rgb[:, 2]])
+    return hexes.astype(object)
+
+
+def map_colors(values, palette, output='hex'):
+    '''
+    Map values to palette colors : each distinct value gets one color of the palette,
+    assigned in sorted order of the values.
+    Input: 
+    - values = list or array of values
+    - palette = string; sns color palette e.g. 'YlOrRd', or list of colors
+    - output = string; 'hex' or 'rgba'
+    
+    Return numpy array of hex colors or RGBA colors (n x 4), one per value.
+    '''
+    codes, n_colors = factorize_values(values)
+    hexes, rgba = get_palette(palette, n_colors)
+    
+    return rgba[codes] if output == 'rgba' else hexes[codes]
+
+
+@functools.lru_cache(maxsize=32)
+def _colormap_lut(cmap, n_colors):
+    
+    lut = mpl.colormaps[cmap](np.linspace(0, 1, n_colors))
+    lut.flags.writeable = False
+    return lut
+
+
+def map_colors_continuous(values, cmap='YlOrRd', vmin=None, vmax=None, output='hex', n_colors=256, nan_color=None):
+    '''
+    Map numeric values to a continuous matplotlib colormap by linear interpolation.
+    Input: 
+    - values = list or array of numbers
+    - cmap = string; matplotlib colormap e.g. 'YlOrRd', 'viridis'
+    - vmin, vmax = floats; value range mapped to the ends of the colormap (default: min and max of values)
+    - output = string; 'hex' or 'rgba'
+    - n_colors = int; number of colormap samples to interpolate between
+    - nan_color = color of NaN values (default: the "bad" color of the colormap)
+    
+    Return numpy array of hex colors or RGBA colors (n x 4), one per value.
+    '''
+    values = np.asarray(values, dtype=float).ravel()
+    if len(values) == 0:
+        return np.empty((0, 4)) if output == 'rgba' else np.empty(0, dtype=object)
+    
+    isnan = np.isnan(values)
+    if not isnan.all():
+        vmin = np.nanmin(values) if vmin is None else vmin
+        vmax = np.nanmax(values) if vmax is None else vmax
+    
+    t = np.clip((values - vmin) / (vmax - vmin), 0, 1) if vmin is not None and vmax is not None and vmax > vmin else np.zeros(len(values))
+    t = np.where(isnan, 0, t) * (n_colors - 1)
+    lo = np.floor(t).astype(int)
+    hi = np.minimum(lo + 1, n_colors - 1)
+    frac = (t - lo)[:, np.newaxis]
+    
+    lut = _colormap_lut(cmap, n_colors)
+    rgba = lut[lo] * (1 - frac) + lut[hi] * frac
+    if isnan.any():
+        rgba[isnan] = mpl.colors.to_rgba(mpl.colormaps[cmap].get_bad() if nan_color is None else nan_color)
+    
+    return rgba if output == 'rgba' else rgba_to_hex(rgba)
+
+
+def color_by_membership(nodes, memberships, restcol):
+    '''
+    Color nodes by group membership.
+    Input: 
+    - nodes = list of nodes 
+    - memberships = list of (collection of nodes, color); a node gets the color of the first collection containing it
+    - restcol = color of all other nodes
+    
+    Return numpy array of colors, one per node.
+    '''
+    groups = [set(group) for group, col in memberships]
+    colors = np.array([col for group, col in memberships] + [restcol], dtype=object)
+    
+    def code(node):
+        for i, group in enumerate(groups):
+            if node in group:
+                return i
+        return len(groups)
+    
+    codes = np.fromiter((code(node) for node in nodes), dtype=np.intp, count=len(nodes))
+    return colors[codes]
+
+
 def color_nodes_from_dict_unsort(d_to_be_colored, palette):
     ''' 
     Generate node colors based on dictionary.
@@ -82,33 +229,11 @@ def color_nodes_from_dict_unsort(d_to_be_colored, palette):
     - palette = sns.color palette e.g. 'YlOrRd' 
     
     Return dictionary (randomly sorted) with nodes as keys and assigned color to each node.
-    ''' 
-
-    # coloringg
-    color_groups = set(d_to_be_colored.values())
-    color_count = len(color_groups)
-    pal = sns.color_palette(palette, color_count)
-    palette = pal.as_hex()
-
-    d_colorgroups = {}
-    for n in color_groups:
-        d_colorgroups[n] = [k for k in d_to_be_colored.keys() if d_to_be_colored[k] == n]
-        
-    d_colorgroups_sorted = {key:d_colorgroups[key] for key in sorted(d_colorgroups.keys())}
-
-    d_val_col = {}
-    for idx,val in enumerate(d_colorgroups_sorted):
-        for ix,v in enumerate(palette):
-            if idx == ix:
-                d_val_col[val] = v
+    '''
 
-    d_node_color = {}
-    for y in d_to_be_colored.items(): # y[0] = node id, y[1] = val
-        for x in d_val_col.items(): # x[0] = val, x[1] = (col,col,col)
-            if x[0] == y[1]:
-                d_node_color[y[0]]=x[1]
+    colors = map_colors(list(d_to_be_colored.values()), palette)
     
-    return d_node_color # colors
+    return dict(zip(d_to_be_colored.keys(), colors))
 
 
 
@@ -121,38 +246,17 @@ def color_nodes_from_dict(G, d_to_be_colored, palette):
     - palette = sns.color palette e.g. 'YlOrRd' 
     
     Return dictionary, sorted according to Graph nodes, with nodes as keys and assigned color to each node.
-    ''' 
+    '''
     
-    # coloring
-    color_groups = set(d_to_be_colored.values())
-    color_count = len(color_groups)
-    pal = sns.color_palette(palette, color_count)
-    palette = pal.as_hex()
-
-    d_colorgroups = {}
-    for n in color_groups:
-        d_colorgroups[n] = [k for k in d_to_be_colored.keys() if d_to_be_colored[k] == n]
-        
-    d_colorgroups_sorted = {key:d_colorgroups[key] for key in sorted(d_colorgroups.keys())}
-
-    d_val_col = {}
-    for idx,val in enumerate(d_colorgroups_sorted):
-        for ix,v in enumerate(palette):
-            if idx == ix:
-                d_val_col[val] = v
-
-    d_node_color = {}
-    for y in d_to_be_colored.items(): # y[0] = node id, y[1] = val
-        for x in d_val_col.items(): # x[0] = val, x[1] = (col,col,col)
-            if x[0] == y[1]:
-                d_node_color[y[0]]=x[1]
+    d_node_color = dict(zip(d_to_be_colored.keys(), map_colors(list(d_to_be_colored.values()), palette)))
 
     # SORT dict based on G.nodes
-    d_node_color_sorted = {key:d_node_color[key] for key in G.nodes()} #dict([(key, d_node_color[key]) for key in G.nodes()])
+    d_node_color_sorted = {key:d_node_color[key] for key in G.nodes()}
     
     return d_node_color_sorted
 
 
+
 def color_nodes_from_list(G, l_nodes, col,restcol='#696969'):
     '''
     Color nodes based on essentiality state.
@@ -165,21 +269,62 @@ def color_nodes_from_list(G, l_nodes, col,restcol='#696969'):
     Return list of colors for each node in the graph, sorted based on Graph nodes.
     '''
 
-    d_nodes = {}
-    for node in l_nodes:
-        d_nodes[node] = col
+    nodes = list(G.nodes())
+    
+    return dict(zip(nodes, color_by_membership(nodes, [(l_nodes, col)], restcol)))
+
 
-    d_restnodes = {}
-    for i in G.nodes():
-        if i not in d_nodes.keys():
-            d_restnodes[i] = restcol
 
-    d_all_nodes = {**d_nodes, **d_restnodes}
-    d_all_nodes_sorted = {key:d_all_nodes[key] for key in G.nodes()}   
+
+def _edge_mask(G, l_nodes, mode='any'):
+    '''
+    Boolean mask over G.edges() from a boolean node mask of l_nodes.
+    Input: 
+    - G = Graph 
+    - l_nodes = list of nodes 
+    - mode = string; 'any' (at least one endpoint in l_nodes) or 'both' (both endpoints in l_nodes)
     
-    return d_all_nodes_sorted
+    Return list of edges (G.edges()) and numpy array of booleans aligned with it.
+    '''
+    nodes = list(G.nodes())
+    d_index = dict(zip(nodes, range(len(nodes))))
+    
+    node_mask = np.zeros(len(nodes), dtype=bool)
+    node_mask[[d_index[n] for n in set(l_nodes) if n in d_index]] = True
+    
+    edges = list(G.edges())
+    edge_index = np.fromiter((d_index[n] for edge in edges for n in edge[:2]), dtype=np.intp, count=2*len(edges)).reshape(-1, 2)
+    
+    if mode == 'both':
+        return edges, node_mask[edge_index[:,0]] & node_mask[edge_index[:,1]]
+    return edges, node_mask[edge_index[:,0]] | node_mask[edge_index[:,1]]
 
 
+def edge_colors_from_nodelist(G, l_nodes, color_main, color_rest, mode='any'):
+    '''
+    Color (highlight) edges from a node list.
+    Input: 
+    - G = Graph 
+    - l_nodes = list of nodes 
+    - color_main = color of highlighted edges 
+    - color_rest = color of all other edges
+    - mode = string; highlight edges with 'any' (at least one) or 'both' endpoints in l_nodes
+    
+    Return numpy array of colors, one per edge aligned with G.edges().
+    '''
+    edges, hit = _edge_mask(G, l_nodes, mode)
+    
+    return np.array([color_rest, color_main], dtype=object)[hit.astype(int)]
+
+
+def _edge_color_dict(edges, hit, color_main, color_rest):
+    '''
+    Dictionary with highlighted edges first (color_main), then all other edges (color_rest), each in the order of edges.
+    '''
+    d_col_edges = dict.fromkeys((edges[i] for i in np.flatnonzero(hit)), color_main)
+    d_grey_edges = dict.fromkeys((edges[i] for i in np.flatnonzero(~hit)), color_rest)
+    
+    return {**d_col_edges, **d_grey_edges}
 
 
 def color_edges_from_nodelist(G, l_nodes, color_main, color_rest): # former: def color_disease_outgoingedges(G, l_majorcolor_nodes, color)
@@ -191,30 +336,13 @@ def color_edges_from_nodelist(G, l_nodes, color_main, color_rest): # former: def
     - color = color to hightlight
     All other edges will remain in grey.
     
-    Return edge list sorted based on G.edges() 
+    Return dictionary with edges as keys and colors as values; highlighted edges first, see edge_colors_from_nodelist 
+    for colors aligned with G.edges().
     '''
     
-    edge_lst = []
-    for edge in G.edges():
-        for e in edge:
-            if e in l_nodes:
-                edge_lst.append(edge)
-
-    d_col_edges = {}
-    for e in edge_lst:
-        d_col_edges[e]=color_main
-    
-    d_grey_edges = {}
-    for edge in G.edges():
-        if edge not in d_col_edges.keys(): 
-            d_grey_edges[edge] = color_rest # '#d3d3d3'
-
-    d_edges_all = {**d_col_edges, **d_grey_edges}
-    d_edges_all_sorted = {key:d_edges_all[key] for key in G.edges()}
-
-    edge_color = list(d_edges_all_sorted.values())
+    edges, hit = _edge_mask(G, l_nodes, 'any')
     
-    return  d_edges_all
+    return _edge_color_dict(edges, hit, color_main, color_rest)
 
 
 def color_edges_from_node(G, node, color):
@@ -247,12 +375,10 @@ def color_edges_from_nodelist_specific(G, l_nodes, color):
     Return edge list for selected edges IF BOTH nodes IN l_genes. 
     '''
     
-    edge_lst = [(u,v)for u,v in G.edges(l_nodes) if u in l_nodes and v in l_nodes]
+    s_nodes = set(l_nodes)
+    edge_lst = [(u,v)for u,v in G.edges(l_nodes) if u in s_nodes and v in s_nodes]
 
-    d_col_edges = {}
-    for e in edge_lst:
-        d_col_edges[e]=color
-    return d_col_edges
+    return dict.fromkeys(edge_lst, color)
 
 
 def color_edges_from_nodelist_specific_or(G, l_nodes, color):
@@ -266,43 +392,36 @@ def color_edges_from_nodelist_specific_or(G, l_nodes, color):
     Return edge list for selected edges IF ONE node is IN l_genes. 
     '''
     
-    edge_lst = [(u,v)for u,v in G.edges(l_nodes) if u in l_nodes or v in l_nodes]
+    s_nodes = set(l_nodes)
+    edge_lst = [(u,v)for u,v in G.edges(l_nodes) if u in s_nodes or v in s_nodes]
 
-    d_col_edges = {}
-    for e in edge_lst:
-        d_col_edges[e]=color
-    return d_col_edges
+    return dict.fromkeys(edge_lst, color)
 
 
 
 
 def color_edges_from_nodelist_both(G, l_nodes, color_main, color_rest):
+    '''
+    Color (highlight) edges with both nodes in a node list.
+    Input: 
+    - G = Graph 
+    - l_nodes = list of nodes 
+    - color_main = color of highlighted edges 
+    - color_rest = color of all other edges
     
-    edge_lst = [(u,v)for u,v in G.edges(l_nodes) if u in l_nodes and v in l_nodes]
-    #edge_dir2 = [(v,u)for v,u in G.edges(l_nodes) if v in l_nodes and u in l_nodes]
-    #edge_lst = edge_dir1+edge_dir2
-    
-    d_col_edges = {}
-    for e in edge_lst:
-        d_col_edges[e]=color_main
+    Return dictionary with edges (as in G.edges()) as keys and colors as values; highlighted edges first.
+    '''
     
-    d_grey_edges = {}
-    for edge in G.edges():
-        if edge not in d_col_edges.keys(): 
-            d_grey_edges[edge] = color_rest
-
-    d_edges_all = {**d_col_edges, **d_grey_edges}
-    d_edges_all_sorted = {key:d_edges_all[key] for key in G.edges()}
-
-    edge_color = list(d_edges_all_sorted.values())
+    edges, hit = _edge_mask(G, l_nodes, 'both')
     
-    return  d_edges_all
+    return _edge_color_dict(edges, hit, color_main, color_rest)
 
 
 def get_edges_between_nodes(G, l_nodes): 
     
-    edge_dir1 = [(u,v)for u,v in G.edges(l_nodes) if u in l_nodes and v in l_nodes]
-    edge_dir2 = [(v,u)for v,u in G.edges(l_nodes) if v in l_nodes and u in l_nodes]
+    s_nodes = set(l_nodes)
+    edge_dir1 = [(u,v)for u,v in G.edges(l_nodes) if u in s_nodes and v in s_nodes]
+    edge_dir2 = [(v,u)for v,u in G.edges(l_nodes) if v in s_nodes and u in s_nodes]
     edge_lst = edge_dir1+edge_dir2
     
     return  edge_lst
@@ -328,7 +447,7 @@ def colors_spectralclustering(G, posG, DM=None, n_clus=20, n_comp=10, pal ='gist
     Generate node colors based on clustering.
     Input:
     - G = Graph
-    - posG = dictionary with nodes as keys and xy(z) coordinates
+    - posG = Layout or dictionary with nodes as keys and xy(z) coordinates
     - n_clus = int; number of clusters
     - n_comp = int; number of components (e.g. 10)
     - palette(optional) = string; sns color palette e.g. "gist_rainbow"
@@ -346,9 +465,9 @@ def colors_spectralclustering(G, posG, DM=None, n_clus=20, n_comp=10, pal ='gist
             if str(g) not in genes:
                 genes_rest.append(g)
 
-        df_posG = pd.DataFrame(posG).T 
+        df_posG = as_layout(posG).coords
 
-        model = SpectralClustering(n_clusters=n_clus,n_components = n_comp, affinity='nearest_neighbors',random_state=0)
+        model = cluster.SpectralClustering(n_clusters=n_clus,n_components = n_comp, affinity='nearest_neighbors',random_state=0)
         clusterid = model.fit(df_posG)
         d_node_clusterid = dict(zip(genes, clusterid.labels_))
 
@@ -362,9 +481,9 @@ def colors_spectralclustering(G, posG, DM=None, n_clus=20, n_comp=10, pal ='gist
         return d_colors
     
     else:
-        df_posG = pd.DataFrame(posG).T 
+        df_posG = as_layout(posG).coords
 
-        model = SpectralClustering(n_clusters=n_clus,n_components = n_comp, affinity='nearest_neighbors',random_state=0)
+        model = cluster.SpectralClustering(n_clusters=n_clus,n_components = n_comp, affinity='nearest_neighbors',random_state=0)
         clusterid = model.fit(df_posG)
         d_node_clusterid = dict(zip(list(G.nodes()), clusterid.labels_))
         colors_all = color_nodes_from_dict_unsort(d_node_clusterid, pal) #'ocean'
@@ -378,7 +497,7 @@ def colors_dbscanclustering(G, posG, DM=None, epsi=0.5, min_sam=5, pal = 'gist_r
     Generate node colors based on clustering.
     Input:
     - G = Graph
-    - posG = dictionary with nodes as keys and xy(z) coordinates
+    - posG = Layout or dictionary with nodes as keys and xy(z) coordinates
     - epsi = float; The maximum distance between two samples for one to be considered as in the neighborhood of the other
     - min_sam = int; The number of samples in a neighborhood
     - palette(optional) = string; sns color palette e.g. "gist_rainbow"
@@ -397,8 +516,8 @@ def colors_dbscanclustering(G, posG, DM=None, epsi=0.5, min_sam=5, pal = 'gist_r
             if str(g) not in genes:
                 genes_rest.append(g)
 
-        df_posG = pd.DataFrame(posG).T 
-        dbscan = DBSCAN(eps=epsi, min_samples=min_sam) 
+        df_posG = as_layout(posG).coords
+        dbscan = cluster.DBSCAN(eps=epsi, min_samples=min_sam) 
         clusterid = dbscan.fit(df_posG)
         d_node_clusterid = dict(zip(genes, clusterid.labels_))
 
@@ -414,8 +533,8 @@ def colors_dbscanclustering(G, posG, DM=None, epsi=0.5, min_sam=5, pal = 'gist_r
     
     else:
         
-        df_posG = pd.DataFrame(posG).T 
-        dbscan = DBSCAN(eps=epsi, min_samples=min_sam) 
+        df_posG = as_layout(posG).coords
+        dbscan = cluster.DBSCAN(eps=epsi, min_samples=min_sam) 
         clusterid = dbscan.fit(df_posG)
         d_node_clusterid = dict(zip(list(G.nodes()), clusterid.labels_))
         colors_all = color_nodes_from_dict_unsort(d_node_clusterid, pal)
@@ -432,7 +551,7 @@ def colors_dbscanclustering_old(G, DM, posG, epsi, min_sam, pal = 'gist_rainbow'
     Generate node colors based on clustering.
     Input:
     - G = Graph
-    - posG = dictionary with nodes as keys and xy(z) coordinates
+    - posG = Layout or dictionary with nodes as keys and xy(z) coordinates
     - epsi = int; number of clusters
     - min_sam = int; number of components (e.g. 10)
     - palette(optional) = string; sns color palette e.g. "gist_rainbow"
@@ -449,8 +568,8 @@ def colors_dbscanclustering_old(G, DM, posG, epsi, min_sam, pal = 'gist_rainbow'
         if str(g) not in genes:
             genes_rest.append(g)
             
-    df_posG = pd.DataFrame(posG).T 
-    dbscan = DBSCAN(eps=epsi, min_samples=min_sam) 
+    df_posG = as_layout(posG).coords
+    dbscan = cluster.DBSCAN(eps=epsi, min_samples=min_sam) 
     clusterid = dbscan.fit(df_posG)
     d_node_clusterid = dict(zip(genes, clusterid.labels_))
 
@@ -468,8 +587,8 @@ def colors_dbscanclustering_old(G, DM, posG, epsi, min_sam, pal = 'gist_rainbow'
 
 def kmeansclustering(posG, n_clus):
     
-    df_posG = pd.DataFrame(posG).T 
-    kmeans = KMeans(n_clusters=n_clus, random_state=0).fit(df_posG)
+    df_posG = as_layout(posG).coords
+    kmeans = cluster.KMeans(n_clusters=n_clus, random_state=0).fit(df_posG)
     centrs = kmeans.cluster_centers_
     
     return kmeans, centrs
@@ -481,7 +600,7 @@ def colors_kmeansclustering(G, DM, kmeans, pal = 'gist_rainbow'):
     Generate node colors based on clustering.
     Input:
     - G = Graph
-    - posG = dictionary with nodes as keys and xy(z) coordinates
+    - posG = Layout or dictionary with nodes as keys and xy(z) coordinates
     - n_clus = int; number of clusters
     - palette(optional) = string; sns color palette e.g. "gist_rainbow"
 
@@ -529,25 +648,13 @@ def color_essentiality_nodes(G, essentials, nonessentials, color1, color2):
     Return list of colors for each node in the graph, sorted based on Graph nodes.
     '''
 
-    d_ess = {}
-    for node in essentials:
-        d_ess[node] = color1
-
-    d_no_ess = {}
-    for node in nonessentials:
-        d_no_ess[node] = color2
-
-    d_essentiality = {**d_ess, **d_no_ess}
-
-    d_restnodes = {}
-    for i in G.nodes():
-        if i not in d_essentiality.keys():
-            d_restnodes[i] = 'grey'
-
-    d_all_essentiality = {**d_essentiality, **d_restnodes}
-    d_all_nodes_sorted = {key:d_all_essentiality[key] for key in G.nodes()}   
+    nodes = list(G.nodes())
     
-    return d_all_nodes_sorted
+    # non-essential wins if a gene is in both lists
+    colors = color_by_membership(nodes, [(nonessentials, color2), (essentials, color1)], 'grey')
+    
+    return dict(zip(nodes, colors))
+
 
 
 def zparam_essentiality(G, essential_genes, non_ess_genes, value_ess, value_noness, value_undef):
@@ -623,26 +730,47 @@ def get_disease_genes(G, d_names_do, d_do_genes, disease_category):
 # -------------------------------------------------------------------------------------
 
    
-def get_hubs(G, max_treshold, min_treshold):
+def _k_hop_neighbours(adj, node, k):
+    '''
+    Set of nodes within k hops of node (node itself excluded), breadth-first over the adjacency adj.
+    '''
+    seen = {node}
+    frontier = [node]
+    for _ in range(k):
+        nxt = [v for u in frontier for v in adj[u] if v not in seen]
+        if not nxt:
+            break
+        frontier = list(dict.fromkeys(nxt))
+        seen.update(frontier)
+    seen.discard(node)
     
-    d_degree = dict(nx.degree(G))
+    return seen
 
-    hubs = {}
-    for k,v in d_degree.items():
-        if v >= min_treshold and v <= max_treshold:
-            hubs[k] = v
+
+def get_hubs(G, max_treshold, min_treshold, k=1):
+    '''
+    Get hubs (nodes with min_treshold <= degree <= max_treshold) and their neighbourhoods.
+    Input: 
+    - G = Graph 
+    - max_treshold = maximum degree of a hub
+    - min_treshold = minimum degree of a hub
+    - k = int; size of the neighbourhood in hops (1 = direct neighbours)
+    
+    Return dictionary with hubs and their degree, and dictionary with hubs and the set of nodes within k hops of each hub.
+    '''
+    nodes = list(G.nodes())
+    degree = np.fromiter((d for n,d in G.degree(nodes)), dtype=int, count=len(nodes))
+    
+    is_hub = (degree >= min_treshold) & (degree <= max_treshold)
+    hubs = {nodes[i]:int(degree[i]) for i in np.flatnonzero(is_hub)}
     #print('Hubs: ',hubs)
 
-    # get their neighbours
-    neighbours = {}
-    hubs_neigh = []
-    for i in hubs.keys():
-        for edge in G.edges():
-            if edge[0] == i:
-                hubs_neigh.append(edge[1])
-            elif edge[1] == i:
-                hubs_neigh.append(edge[0])
-        neighbours[i] = hubs_neigh
+    # get their neighbours (in both edge directions for directed graphs)
+    adj = G.to_undirected(as_view=True).adj if G.is_directed() else G.adj
+    if k == 1:
+        neighbours = {i:set(adj[i]) - {i} for i in hubs}
+    else:
+        neighbours = {i:_k_hop_neighbours(adj, i, k) for i in hubs}
     print('num of neighbors:', len(neighbours))
     
     return hubs,neighbours
@@ -653,19 +781,10 @@ def color_nodes_hubs(G, hubs, neighs, hubs_col_nodes, neigh_col_nodes):
     
     rest_col_nodes = '#d3d3d3' 
 
-    colors_hubs = {}
-    for i in G.nodes():
-        if str(i) in hubs.keys():
-            colors_hubs[i] = hubs_col_nodes
-        elif str(i) in neighs.keys():
-            colors_hubs[i] = neigh_col_nodes
-        else: 
-            colors_hubs[i] = rest_col_nodes
-
-    hubs_all_sorted = {key:colors_hubs[key] for key in G.nodes()}
-    #colors = list(hubs_all_sorted.values())
+    nodes = list(G.nodes())
+    colors = color_by_membership([str(i) for i in nodes], [(hubs.keys(), hubs_col_nodes), (neighs.keys(), neigh_col_nodes)], rest_col_nodes)
     
-    return hubs_all_sorted 
+    return dict(zip(nodes, colors))
 
 
 